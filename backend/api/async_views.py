@@ -0,0 +1,160 @@
+from asgiref.sync import sync_to_async
+from django.contrib.auth.models import AnonymousUser
+from django.http import HttpResponse
+from django.utils.cache import (
+    get_conditional_response,
+    patch_vary_headers,
+    quote_etag,
+)
+from django.utils.http import http_date
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework.exceptions import NotFound
+from rest_framework.request import Request
+
+from api.renderers import FastJSONRenderer
+from api.serializers import RecipeSerializer
+from api.views import (
+    IngredientViewSet,
+    RecipeViewSet,
+    get_recipe_read_queryset,
+)
+from core.constants import MAX_INGREDIENT_SEARCH_RESULTS
+from recipes.models import Recipe
+from recipes.search import ingredient_index
+from recipes.versions import reference_data_version
+
+PAGE_QUERY_PARAMS = {'page', 'limit'}
+
+recipe_list_view = sync_to_async(RecipeViewSet.as_view(
+    {'get': 'list', 'post': 'create'},
+    basename='recipes',
+    detail=False
+))
+recipe_detail_view = sync_to_async(RecipeViewSet.as_view(
+    {
+        'get': 'retrieve',
+        'put': 'update',
+        'patch': 'partial_update',
+        'delete': 'destroy'
+    },
+    basename='recipes',
+    detail=True
+))
+ingredient_list_view = sync_to_async(IngredientViewSet.as_view(
+    {'get': 'list'},
+    basename='ingredients',
+    detail=False
+))
+
+
+def is_anonymous_read(request, allowed_params=()):
+    """
+    Можно ли ответить на запрос асинхронно.
+
+    Асинхронный путь обслуживает только GET-запросы без токена
+    с известными параметрами, остальные передаются синхронным
+    представлениям DRF.
+    """
+    return (
+        request.method == 'GET'
+        and 'HTTP_AUTHORIZATION' not in request.META
+        and set(request.GET) <= set(allowed_params)
+    )
+
+
+def render(data, cache_status=None):
+    response = HttpResponse(
+        FastJSONRenderer().render(data), content_type='application/json'
+    )
+    if cache_status is not None:
+        response['X-Cache'] = cache_status
+    patch_vary_headers(response, ('Accept',))
+    return response
+
+
+async def get_recipe_page(request):
+    """
+    Страница рецептов для анонимного пользователя.
+
+    Используется та же пагинация, что и в RecipeViewSet, поэтому ссылки
+    и кэш количества совпадают с синхронным списком, а запросы к БД
+    выполняются асинхронным ORM. Для несуществующей страницы
+    возвращается None.
+    """
+    request = Request(request)
+    paginator = RecipeViewSet.pagination_class()
+    try:
+        recipes = await paginator.apaginate_queryset(
+            get_recipe_read_queryset(AnonymousUser()), request
+        )
+    except NotFound:
+        return None
+    return paginator.get_paginated_response(
+        RecipeSerializer(recipes, many=True, context={'request': request}).data
+    ).data
+
+
+@csrf_exempt
+async def recipe_list(request):
+    """Асинхронный список рецептов для анонимных пользователей."""
+    if not is_anonymous_read(request, PAGE_QUERY_PARAMS):
+        return await recipe_list_view(request)
+    data, cache_status = await RecipeViewSet.response_cache.aget_data(
+        request, lambda: get_recipe_page(request)
+    )
+    if data is None:
+        return await recipe_list_view(request)
+    return render(data, cache_status)
+
+
+@csrf_exempt
+async def recipe_detail(request, pk):
+    """Асинхронная карточка рецепта для анонимных пользователей."""
+    if not is_anonymous_read(request):
+        return await recipe_detail_view(request, pk=pk)
+
+    async def get_data():
+        try:
+            recipe = await get_recipe_read_queryset(
+                AnonymousUser()
+            ).aget(pk=pk)
+        except Recipe.DoesNotExist:
+            return None
+        return RecipeSerializer(recipe, context={'request': request}).data
+
+    data, cache_status = await RecipeViewSet.response_cache.aget_data(
+        request, get_data
+    )
+    if data is None:
+        return await recipe_detail_view(request, pk=pk)
+    return render(data, cache_status)
+
+
+@csrf_exempt
+async def ingredient_list(request):
+    """
+    Асинхронный поиск ингредиентов по началу названия.
+
+    Ответ строится по индексу в памяти и поддерживает условные
+    запросы по версии справочных данных, как и синхронный список.
+    """
+    name = request.GET.get('name', '').strip()
+    if (
+        not name
+        or not ingredient_index.is_enabled()
+        or not is_anonymous_read(request, ('name',))
+    ):
+        return await ingredient_list_view(request)
+    version, modified = await reference_data_version.aget()
+    etag = f'W/{quote_etag(version)}'
+    last_modified = int(modified.timestamp())
+    response = get_conditional_response(
+        request, etag=etag, last_modified=last_modified
+    )
+    if response is None:
+        response = render(await ingredient_index.asearch(
+            name, limit=MAX_INGREDIENT_SEARCH_RESULTS
+        ))
+    response.headers.setdefault('Last-Modified', http_date(last_modified))
+    response.headers.setdefault('ETag', etag)
+    return response
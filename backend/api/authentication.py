@@ -0,0 +1,26 @@
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+
+from users import token_cache
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """
+    Аутентификация по токену с пользователем в общем кэше.
+
+    При попадании в кэш запрос обходится без соединения таблиц токенов
+    и пользователей. Записи становятся недействительными при выходе
+    из системы, смене пароля и любом изменении пользователя, а при
+    промахе пользователь читается из БД как в TokenAuthentication.
+    Без общего кэша поведение совпадает с TokenAuthentication.
+    """
+
+    def authenticate_credentials(self, key):
+        if not token_cache.is_enabled():
+            return super().authenticate_credentials(key)
+        user = token_cache.get_cached_user(key)
+        if user is not None and user.is_active:
+            return user, Token(key=key, user=user)
+        user, token = super().authenticate_credentials(key)
+        token_cache.cache_user(key, user)
+        return user, token
@@ -0,0 +1,104 @@
+import hashlib
+
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+from rest_framework import status
+from rest_framework.response import Response
+
+from core.caches import is_shared_cache
+
+
+class AnonymousResponseCache:
+    """
+    Кэш ответов на GET-запросы анонимных пользователей.
+
+    Ключ строится из адреса запроса и отсортированных параметров,
+    а также из текущих версий данных, от которых зависит ответ. Смена
+    любой версии делает старые записи недоступными, и они вытесняются
+    по истечении срока хранения.
+
+    С кэшем в памяти процесса смена версии в одном воркере не видна
+    в других, поэтому без общего кэша ответы не кэшируются.
+    """
+
+    def __init__(self, prefix, versions, timeout):
+        self.prefix = prefix
+        self.versions = versions
+        self.timeout = timeout
+
+    def get_key(self, request):
+        params = sorted(
+            (key, sorted(values))
+            for key, values in request.GET.lists()
+        )
+        request_hash = hashlib.md5(
+            f'{request.build_absolute_uri(request.path)}|{params}'.encode()
+        ).hexdigest()
+        versions = ':'.join(
+            version.get_token() for version in self.versions
+        )
+        return f'{self.prefix}:{versions}:{request_hash}'
+
+    def lookup(self, request):
+        """Ключ кэша и сохранённые данные или None с учётом статистики."""
+        key = self.get_key(request)
+        data = cache.get(key)
+        self.count('misses' if data is None else 'hits')
+        return key, data
+
+    def get_response(self, request, view_method, *args, **kwargs):
+        if request.user.is_authenticated or not is_shared_cache():
+            return view_method(request, *args, **kwargs)
+        key, data = self.lookup(request)
+        if data is not None:
+            response = Response(data)
+            response['X-Cache'] = 'HIT'
+            return response
+        response = view_method(request, *args, **kwargs)
+        if response.status_code == status.HTTP_200_OK:
+            cache.set(key, response.data, self.timeout)
+        response['X-Cache'] = 'MISS'
+        return response
+
+    async def aget_data(self, request, get_data):
+        """
+        Асинхронно возвращает данные ответа и признак попадания в кэш.
+
+        Ключи совпадают с ключами get_response, поэтому синхронный
+        и асинхронный пути используют одни и те же записи. Поиск
+        в кэше выполняется за один переход в поток. get_data может
+        вернуть None, тогда в кэш ничего не записывается.
+        """
+        if not is_shared_cache():
+            return await get_data(), None
+        key, data = await sync_to_async(self.lookup)(request)
+        if data is not None:
+            return data, 'HIT'
+        data = await get_data()
+        if data is not None:
+            await cache.aset(key, data, self.timeout)
+        return data, 'MISS'
+
+    def get_counter_key(self, name):
+        return f'{self.prefix}:stats:{name}'
+
+    def count(self, name):
+        key = self.get_counter_key(name)
+        cache.add(key, 0, None)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, 1, None)
+
+    def get_stats(self):
+        counters = cache.get_many(
+            [self.get_counter_key('hits'), self.get_counter_key('misses')]
+        )
+        hits = counters.get(self.get_counter_key('hits'), 0)
+        misses = counters.get(self.get_counter_key('misses'), 0)
+        return {
+            'hits': hits,
+            'misses': misses,
+            'hit_ratio': round(hits / (hits + misses), 4)
+            if hits + misses else None
+        }
@@ -1,8 +1,11 @@
-from django.db.models import Q
+from django.db.models import F
 from django_filters import rest_framework as filters
 from rest_framework.filters import SearchFilter
 
-from recipes.models import Recipe
+from recipes.fulltext import search_recipes
+from recipes.models import Recipe, Tag
+
+TAGS_MODE_ALL = 'all'
 
 
 class CustomSearchFilter(SearchFilter):
@@ -13,6 +16,16 @@ class CustomSearchFilter(SearchFilter):
         return [item.lower() for item in search]
 
 
+class StableOrderingFilter(filters.OrderingFilter):
+    """Сортировка с id в конце, чтобы страницы не пересекались."""
+
+    def filter(self, qs, value):
+        qs = super().filter(qs, value)
+        if value:
+            qs = qs.order_by(*qs.query.order_by, '-id')
+        return qs
+
+
 class RecipeFilter(filters.FilterSet):
     tags = filters.CharFilter(
         field_name='tags__slug',
@@ -28,19 +41,49 @@ class RecipeFilter(filters.FilterSet):
     is_in_shopping_cart = filters.NumberFilter(
         method='filter_in_shopping_cart'
     )
+    search = filters.CharFilter(
+        method='filter_search'
+    )
+    min_favorites_count = filters.NumberFilter(
+        field_name='favorites_count',
+        lookup_expr='gte'
+    )
+    ordering = StableOrderingFilter(
+        fields=('pub_date', 'favorites_count', 'cooking_time')
+    )
 
     class Meta:
         model = Recipe
-        fields = ('tags', 'author', 'is_favorited', 'is_in_shopping_cart')
+        fields = (
+            'tags',
+            'author',
+            'is_favorited',
+            'is_in_shopping_cart',
+            'search',
+            'min_favorites_count',
+            'ordering'
+        )
 
     def filter_by_tags(self, queryset, name, value):
-        tags = self.request.GET.getlist('tags')
-        if tags:
-            query = Q()
-            for tag in tags:
-                query |= Q(tags__slug=tag.strip())
-            return queryset.filter(query).distinct()
-        return queryset
+        """
+        Фильтрация по битовой маске тегов без соединения с таблицей тегов.
+
+        По умолчанию подходят рецепты хотя бы с одним из тегов,
+        при tags_mode=all - рецепты со всеми переданными тегами.
+        """
+        slugs = {tag.strip() for tag in self.request.GET.getlist('tags')}
+        if not slugs:
+            return queryset
+        bits = list(
+            Tag.objects.filter(slug__in=slugs).values_list('bit', flat=True)
+        )
+        mask = Tag.get_mask(bits)
+        queryset = queryset.alias(tags_match=F('tags_mask').bitand(mask))
+        if self.request.GET.get('tags_mode') == TAGS_MODE_ALL:
+            if len(bits) < len(slugs):
+                return queryset.none()
+            return queryset.filter(tags_match=mask)
+        return queryset.filter(tags_match__gt=0)
 
     def filter_favorited(self, queryset, name, is_favorited):
         user = self.request.user
@@ -53,3 +96,7 @@ class RecipeFilter(filters.FilterSet):
         if is_in_shopping_cart == 1 and user.is_authenticated:
             return queryset.filter(shopping_listed__user=user)
         return queryset
+
+    def filter_search(self, queryset, name, value):
+        """Полнотекстовый поиск с сортировкой по релевантности."""
+        return search_recipes(queryset, value)
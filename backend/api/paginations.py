@@ -1,5 +1,245 @@
-from rest_framework.pagination import PageNumberPagination
+import base64
+import functools
+import hashlib
+import json
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.core.paginator import InvalidPage, Paginator
+from django.db.models import Q
+from django.utils.functional import cached_property
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import CursorPagination, PageNumberPagination
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+from core.constants import MAX_PAGE_SIZE
+
+
+class CachedCountPaginator(Paginator):
+    """
+    Пагинатор, кэширующий общее количество объектов.
+
+    При PAGINATION_COUNT_CACHE_TIMEOUT > 0 и переданном count_key
+    результат COUNT(*) хранится в общем кэше, и соседние страницы
+    одного списка не пересчитывают его. Количество может отставать
+    от БД не больше чем на время хранения.
+    """
+
+    def __init__(self, *args, count_key=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.count_key = count_key
+
+    @cached_property
+    def count(self):
+        timeout = settings.PAGINATION_COUNT_CACHE_TIMEOUT
+        if not timeout or self.count_key is None:
+            return super().count
+        count = cache.get(self.count_key)
+        if count is None:
+            count = super().count
+            cache.set(self.count_key, count, timeout)
+        return count
+
+    async def acount(self):
+        """
+        Асинхронно считает объекты и запоминает результат в count.
+
+        После вызова страницы строятся без синхронных обращений к БД.
+        """
+        timeout = settings.PAGINATION_COUNT_CACHE_TIMEOUT
+        count = None
+        if timeout and self.count_key is not None:
+            count = await cache.aget(self.count_key)
+        if count is None:
+            count = await self.object_list.acount()
+            if timeout and self.count_key is not None:
+                await cache.aset(self.count_key, count, timeout)
+        self.__dict__['count'] = count
+        return count
+
+
+class KeysetPagination(CursorPagination):
+    """
+    Пагинация по курсору без OFFSET и COUNT(*).
+
+    Порядок задаётся атрибутом keyset_ordering представления, последнее
+    поле в нём должно быть уникальным. Курсор хранит значения всех полей
+    порядка у крайнего объекта страницы, и следующая страница выбирается
+    условием вида Q(pub_date__lt=p) | Q(pub_date=p, id__lt=i), поэтому
+    глубокие страницы читаются по индексу так же быстро, как первая.
+    """
+
+    page_size_query_param = 'limit'
+    max_page_size = MAX_PAGE_SIZE
+    invalid_cursor_message = 'Неверный курсор.'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.base_url = request.build_absolute_uri()
+        self.page_size = self.get_page_size(request)
+        self.ordering = tuple(view.keyset_ordering)
+        self.fields = [
+            queryset.model._meta.get_field(name.lstrip('-'))
+            for name in self.ordering
+        ]
+        position, reverse = self.get_position(request)
+        ordering = self.ordering
+        if reverse:
+            ordering = tuple(
+                name[1:] if name.startswith('-') else f'-{name}'
+                for name in ordering
+            )
+        queryset = queryset.order_by(*ordering)
+        if position is not None:
+            queryset = queryset.filter(
+                self.get_position_filter(ordering, position)
+            )
+        results = list(queryset[:self.page_size + 1])
+        has_more = len(results) > self.page_size
+        self.page = results[:self.page_size]
+        if reverse:
+            self.page.reverse()
+            self.has_next, self.has_previous = True, has_more
+        else:
+            self.has_next = has_more
+            self.has_previous = position is not None
+        return self.page
+
+    def get_position_filter(self, ordering, position):
+        """Объекты строго после position в порядке ordering."""
+        position_filter = Q()
+        equal = {}
+        for name, value in zip(ordering, position):
+            field = name.lstrip('-')
+            lookup = 'lt' if name.startswith('-') else 'gt'
+            position_filter |= Q(**equal, **{f'{field}__{lookup}': value})
+            equal[field] = value
+        return position_filter
+
+    def get_position(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None, False
+        try:
+            data = json.loads(base64.urlsafe_b64decode(encoded.encode()))
+            values = data['p']
+            if len(values) != len(self.fields):
+                raise ValueError
+            position = [
+                field.to_python(value)
+                for field, value in zip(self.fields, values)
+            ]
+            return position, bool(data.get('r'))
+        except (TypeError, ValueError, KeyError, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def get_cursor_link(self, instance, reverse):
+        data = {
+            'p': [field.value_to_string(instance) for field in self.fields]
+        }
+        if reverse:
+            data['r'] = 1
+        encoded = base64.urlsafe_b64encode(
+            json.dumps(data, separators=(',', ':')).encode()
+        ).decode()
+        return replace_query_param(
+            self.base_url, self.cursor_query_param, encoded
+        )
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.get_cursor_link(self.page[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if not self.page:
+            return remove_query_param(
+                self.base_url, self.cursor_query_param
+            )
+        return self.get_cursor_link(self.page[0], reverse=True)
 
 
 class PageLimitPagination(PageNumberPagination):
+    """
+    Постраничная пагинация с параметром limit.
+
+    Если представление задаёт keyset_ordering, параметр cursor
+    переключает его на пагинацию по курсору; пустое значение cursor
+    соответствует первой странице. Параметры из ordering_query_params
+    представления задают свой порядок, и с ними курсор не используется.
+    Количество объектов кэшируется по адресу, параметрам фильтрации
+    и пользователю запроса, без номера страницы.
+    """
+
     page_size_query_param = 'limit'
+    max_page_size = MAX_PAGE_SIZE
+    django_paginator_class = CachedCountPaginator
+    keyset_pagination_class = KeysetPagination
+
+    keyset_paginator = None
+
+    def use_keyset(self, request, view):
+        params = request.query_params
+        return (
+            getattr(view, 'keyset_ordering', None)
+            and KeysetPagination.cursor_query_param in params
+            and not any(
+                param in params
+                for param in getattr(view, 'ordering_query_params', ())
+            )
+        )
+
+    def get_count_key(self, request):
+        params = sorted(
+            (key, sorted(values))
+            for key, values in request.query_params.lists()
+            if key not in (self.page_query_param, self.page_size_query_param)
+        )
+        return 'pagination_count:' + hashlib.md5(
+            f'{request.path}|{request.user.pk}|{params}'.encode()
+        ).hexdigest()
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if self.use_keyset(request, view):
+            self.keyset_paginator = self.keyset_pagination_class()
+            return self.keyset_paginator.paginate_queryset(
+                queryset, request, view
+            )
+        self.django_paginator_class = functools.partial(
+            CachedCountPaginator, count_key=self.get_count_key(request)
+        )
+        return super().paginate_queryset(queryset, request, view)
+
+    async def apaginate_queryset(self, queryset, request):
+        """
+        Асинхронная постраничная выборка без курсора.
+
+        Номер и размер страницы, кэш количества и ссылки те же, что
+        в paginate_queryset, но COUNT(*) и объекты страницы читаются
+        асинхронным ORM.
+        """
+        page_size = self.get_page_size(request)
+        paginator = CachedCountPaginator(
+            queryset, page_size, count_key=self.get_count_key(request)
+        )
+        await paginator.acount()
+        page_number = request.query_params.get(self.page_query_param) or 1
+        try:
+            self.page = paginator.page(page_number)
+        except InvalidPage as error:
+            raise NotFound(self.invalid_page_message.format(
+                page_number=page_number, message=str(error)
+            ))
+        self.request = request
+        return [
+            obj async for obj in self.page.object_list.aiterator(
+                chunk_size=page_size
+            )
+        ]
+
+    def get_paginated_response(self, data):
+        if self.keyset_paginator is not None:
+            return self.keyset_paginator.get_paginated_response(data)
+        return super().get_paginated_response(data)
@@ -1,3 +1,7 @@
+import ipaddress
+
+from django.conf import settings
+from django.utils.crypto import constant_time_compare
 from rest_framework.permissions import SAFE_METHODS, BasePermission
 
 
@@ -9,4 +13,26 @@ class IsAuthorOrReadOnly(BasePermission):
 
     def has_object_permission(self, request, view, obj):
         return (request.method in SAFE_METHODS
-                or obj.author == request.user)
+                or obj.author_id == request.user.id)
+
+
+class IsMetricsClient(BasePermission):
+    """
+    Доступ к метрикам по токену METRICS_TOKEN в заголовке
+    Authorization: Bearer или с адресов из METRICS_ALLOWED_IPS.
+    """
+
+    def has_permission(self, request, view):
+        token = settings.METRICS_TOKEN
+        if token and constant_time_compare(
+            request.META.get('HTTP_AUTHORIZATION', ''), f'Bearer {token}'
+        ):
+            return True
+        try:
+            address = ipaddress.ip_address(request.META.get('REMOTE_ADDR'))
+        except ValueError:
+            return False
+        return any(
+            address in ipaddress.ip_network(network, strict=False)
+            for network in settings.METRICS_ALLOWED_IPS
+        )
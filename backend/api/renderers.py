@@ -0,0 +1,140 @@
+import abc
+import csv
+import json
+
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Как и JSONRenderer, экранируем символы, недопустимые в строках JavaScript.
+UNSAFE_JSON_CHARACTERS = {
+    '\u2028'.encode(): b'\\u2028',
+    '\u2029'.encode(): b'\\u2029',
+}
+
+
+class Echo:
+    """Псевдобуфер: возвращает записанную строку вместо её хранения."""
+
+    def write(self, value):
+        return value
+
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    JSON-рендерер на orjson с тем же выводом, что и у JSONRenderer.
+
+    Даты, время, Decimal и ленивые строки приводятся кодировщиком DRF.
+    Без установленного orjson, для отступов и при некомпактных
+    настройках DRF работает стандартный рендерер.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if (
+            orjson is None
+            or data is None
+            or self.ensure_ascii
+            or not self.compact
+            or not self.strict
+            or self.get_indent(accepted_media_type, renderer_context or {})
+        ):
+            return super().render(
+                data, accepted_media_type, renderer_context
+            )
+        try:
+            ret = orjson.dumps(
+                data,
+                default=self.encoder_class().default,
+                option=orjson.OPT_NON_STR_KEYS
+                | orjson.OPT_PASSTHROUGH_DATETIME
+            )
+        except orjson.JSONEncodeError:
+            return super().render(
+                data, accepted_media_type, renderer_context
+            )
+        for character, escaped in UNSAFE_JSON_CHARACTERS.items():
+            if character in ret:
+                ret = ret.replace(character, escaped)
+        return ret
+
+
+class ShoppingCartRenderer(FastJSONRenderer, metaclass=abc.ABCMeta):
+    """
+    Базовый класс рендерера для выгрузки списка покупок.
+
+    Файл отдаётся построчно генератором stream, поэтому не собирается
+    в памяти целиком. Ответы с ошибками рендерятся как JSON.
+    """
+
+    charset = 'utf-8'
+    filename = 'Список покупок'
+
+    @abc.abstractmethod
+    def stream(self, items):
+        """Генератор строк файла по строкам списка покупок."""
+
+    def get_filename(self):
+        return f'{self.filename}.{self.format}'
+
+
+class ShoppingCartTextRenderer(ShoppingCartRenderer):
+    media_type = 'text/plain'
+    format = 'txt'
+
+    def stream(self, items):
+        for item in items:
+            yield (
+                f"{item['ingredient__name']} "
+                f"- {item['amount']} "
+                f"{item['ingredient__measurement_unit']}\n"
+            )
+
+
+class ShoppingCartCSVRenderer(ShoppingCartRenderer):
+    media_type = 'text/csv'
+    format = 'csv'
+
+    def stream(self, items):
+        writer = csv.writer(Echo())
+        yield writer.writerow(('name', 'measurement_unit', 'amount'))
+        for item in items:
+            yield writer.writerow((
+                item['ingredient__name'],
+                item['ingredient__measurement_unit'],
+                item['amount']
+            ))
+
+
+class ShoppingCartJSONRenderer(ShoppingCartRenderer):
+    format = 'json'
+
+    def stream(self, items):
+        separator = ''
+        yield '['
+        for item in items:
+            yield separator + json.dumps(
+                {
+                    'name': item['ingredient__name'],
+                    'measurement_unit': item['ingredient__measurement_unit'],
+                    'amount': item['amount']
+                },
+                ensure_ascii=False
+            )
+            separator = ','
+        yield ']'
+
+
+class PrometheusRenderer(BaseRenderer):
+    """Рендерер метрик в текстовом формате Prometheus."""
+
+    media_type = 'text/plain'
+    format = 'prometheus'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if isinstance(data, dict):
+            data = ''.join(f'{value}\n' for value in data.values())
+        return data.encode(self.charset)
@@ -2,16 +2,21 @@ import base64
 
 from django.contrib.auth import get_user_model
 from django.core.files.base import ContentFile
+from django.db import transaction
+from django.db.models import prefetch_related_objects
 from djoser.serializers import UserCreateSerializer, UserSerializer
 from rest_framework import serializers
+from rest_framework.fields import get_attribute
 from rest_framework.validators import UniqueTogetherValidator
 
 from core.constants import MAX_LENGTH_USER_NAME
+from core.images import get_variant_urls, get_variants_flag
 from recipes.models import (
     Favorite,
     Ingredient,
     IngredientInRecipe,
     Recipe,
+    ShoppingCartIngredient,
     ShoppingList,
     Tag,
 )
@@ -29,6 +34,36 @@ class Base64ImageField(serializers.ImageField):
         return super().to_internal_value(data)
 
 
+class ImageVariantsField(serializers.ReadOnlyField):
+    """
+    Адреса уменьшенных копий изображения по размерам и форматам.
+
+    Готовность копий берётся из поля <изображение>_variants_ready
+    того же объекта; пока копий нет, отдаются адреса исходного файла.
+    """
+
+    def get_attribute(self, instance):
+        image = super().get_attribute(instance)
+        if not image:
+            return None
+        owner = get_attribute(instance, self.source_attrs[:-1])
+        return image, getattr(owner, get_variants_flag(self.source_attrs[-1]))
+
+    def to_representation(self, value):
+        image, ready = value
+        urls = get_variant_urls(image.name, ready)
+        request = self.context.get('request')
+        if request is None:
+            return urls
+        return {
+            variant: {
+                extension: request.build_absolute_uri(url)
+                for extension, url in formats.items()
+            }
+            for variant, formats in urls.items()
+        }
+
+
 class UserRegistrationSerializer(UserCreateSerializer):
     first_name = serializers.CharField(
         required=True,
@@ -43,6 +78,7 @@ class UserRegistrationSerializer(UserCreateSerializer):
 class UserMainSerializer(UserSerializer):
     is_subscribed = serializers.SerializerMethodField()
     avatar = serializers.SerializerMethodField(default=None)
+    avatar_variants = ImageVariantsField(source='avatar')
 
     class Meta:
         model = User
@@ -53,10 +89,15 @@ class UserMainSerializer(UserSerializer):
             'last_name',
             'email',
             'is_subscribed',
-            'avatar'
+            'avatar',
+            'avatar_variants',
+            'subscribers_count'
         )
+        read_only_fields = ('subscribers_count',)
 
     def get_is_subscribed(self, obj):
+        if hasattr(obj, 'is_subscribed'):
+            return obj.is_subscribed
         request = self.context.get('request')
         return (
             request
@@ -93,12 +134,35 @@ class SubscriptionSerializer(serializers.ModelSerializer):
         ).data
 
 
+class RecipesLimitSerializer(serializers.Serializer):
+    """
+    Класс сериализатора для параметра запроса recipes_limit.
+
+    Пустое значение и 0, как и отсутствие параметра, означают
+    вывод всех рецептов автора.
+    """
+
+    recipes_limit = serializers.IntegerField(
+        min_value=0, required=False, allow_null=True
+    )
+
+    def validate_recipes_limit(self, value):
+        return value or None
+
+
+class CookableRecipesQuerySerializer(serializers.Serializer):
+    """Класс сериализатора для параметров поиска рецептов по продуктам."""
+
+    ingredients = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False
+    )
+    max_missing = serializers.IntegerField(min_value=0, required=False)
+
+
 class UserRecipeSerializer(UserMainSerializer):
     recipes = serializers.SerializerMethodField()
-    recipes_count = serializers.IntegerField(
-        read_only=True,
-        source='author_recipes.count'
-    )
+    recipes_count = serializers.IntegerField(read_only=True)
 
     class Meta:
         model = User
@@ -110,6 +174,8 @@ class UserRecipeSerializer(UserMainSerializer):
             'email',
             'is_subscribed',
             'avatar',
+            'avatar_variants',
+            'subscribers_count',
             'recipes',
             'recipes_count'
         )
@@ -121,17 +187,14 @@ class UserRecipeSerializer(UserMainSerializer):
             'email',
             'is_subscribed',
             'avatar',
+            'avatar_variants',
+            'subscribers_count',
             'recipes',
             'recipes_count'
         )
 
     def get_recipes(self, obj):
-        request = self.context.get('request')
-        recipes_limit = request.query_params.get('recipes_limit')
-        recipes = obj.author_recipes.all()
-        if recipes_limit:
-            recipes = recipes[:int(recipes_limit)]
-        return RecipeShortSerializer(recipes, many=True).data
+        return RecipeShortSerializer(obj.limited_recipes, many=True).data
 
 
 class AvatarSerializer(serializers.ModelSerializer):
@@ -160,10 +223,11 @@ class FavoriteShoppingListBaseSerializer(serializers.ModelSerializer):
     id = serializers.IntegerField(source='recipe.id')
     name = serializers.CharField(source='recipe.name')
     image = serializers.ImageField(source='recipe.image', required=False)
+    image_variants = ImageVariantsField(source='recipe.image')
     cooking_time = serializers.IntegerField(source='recipe.cooking_time')
 
     class Meta:
-        fields = ('id', 'name', 'image', 'cooking_time')
+        fields = ('id', 'name', 'image', 'image_variants', 'cooking_time')
         read_only_fields = ('id', 'name', 'image', 'cooking_time')
 
 
@@ -181,10 +245,22 @@ class ShoppingListSerializer(FavoriteShoppingListBaseSerializer):
         model = ShoppingList
 
 
+class IngredientIdField(serializers.PrimaryKeyRelatedField):
+    """
+    Поле id ингредиента, которое при записи проверяет только формат.
+
+    Сами ингредиенты загружаются одним запросом для всего рецепта
+    в RecipeSerializer.validate.
+    """
+
+    def to_internal_value(self, data):
+        return serializers.IntegerField().run_validation(data)
+
+
 class IngredientInRecipeSerializer(serializers.ModelSerializer):
     """Класс сериализатора для ингредиентов в рецепте."""
 
-    id = serializers.PrimaryKeyRelatedField(
+    id = IngredientIdField(
         queryset=Ingredient.objects.all(),
         source='ingredient'
     )
@@ -209,23 +285,27 @@ class RecipeSerializer(serializers.ModelSerializer):
 
     author = UserMainSerializer(read_only=True)
     image = Base64ImageField(required=False, allow_null=False)
+    image_variants = ImageVariantsField(source='image')
     is_favorited = serializers.SerializerMethodField()
     is_in_shopping_cart = serializers.SerializerMethodField()
 
     class Meta:
         model = Recipe
-        fields = ('id', 'tags', 'author', 'ingredients', 'image', 'name',
-                  'text', 'cooking_time', 'is_favorited',
-                  'is_in_shopping_cart')
-        read_only_fields = ('is_favorited', 'is_in_shopping_cart')
+        fields = ('id', 'tags', 'author', 'ingredients', 'image',
+                  'image_variants', 'name', 'text', 'cooking_time',
+                  'is_favorited', 'is_in_shopping_cart', 'favorites_count')
+        read_only_fields = (
+            'is_favorited', 'is_in_shopping_cart', 'favorites_count'
+        )
 
     def validate(self, data):
-        ingredients = self.initial_data.get('ingredients')
+        ingredients = data.get('ingredients_in_recipe')
         if not ingredients:
             raise serializers.ValidationError(
                 'Не передан ни один ингредиент.'
             )
-        if len(ingredients) > len({item['id'] for item in ingredients}):
+        ingredient_ids = [item['ingredient'] for item in ingredients]
+        if len(ingredient_ids) > len(set(ingredient_ids)):
             raise serializers.ValidationError('Дублирующиеся ингридиенты')
 
         tags = self.initial_data.get('tags')
@@ -233,18 +313,47 @@ class RecipeSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError(
                 'Не передан ни один тэг.'
             )
-        if len(tags) > len(set(tags)):
+        try:
+            tag_ids = serializers.ListField(
+                child=serializers.IntegerField()
+            ).run_validation(tags)
+        except serializers.ValidationError as error:
+            raise serializers.ValidationError({'tags': error.detail})
+        if len(tag_ids) > len(set(tag_ids)):
             raise serializers.ValidationError('Дублирующиеся тэги')
 
-        for tag_id in tags:
-            try:
-                Tag.objects.get(id=tag_id)
-            except Tag.DoesNotExist:
-                raise serializers.ValidationError(f'Нет тега c id = {tag_id}.')
-
+        ingredients_by_id = self.get_objects(
+            Ingredient, ingredient_ids, 'ingredients', 'Нет ингредиентов c id'
+        )
+        for item in ingredients:
+            item['ingredient'] = ingredients_by_id[item['ingredient']]
+        tags_by_id = self.get_objects(Tag, tag_ids, 'tags', 'Нет тегов c id')
+        data['tags'] = [tags_by_id[tag_id] for tag_id in tag_ids]
         return data
 
+    def get_objects(self, model, ids, field_name, message):
+        """
+        Загружает объекты по списку id одним запросом.
+
+        Если каких-то объектов нет, сообщает сразу обо всех
+        отсутствующих id.
+        """
+        objects = model.objects.in_bulk(ids)
+        missing_ids = [str(pk) for pk in ids if pk not in objects]
+        if missing_ids:
+            raise serializers.ValidationError(
+                {field_name: f'{message} = {", ".join(missing_ids)}.'}
+            )
+        return objects
+
+    def to_representation(self, instance):
+        if hasattr(instance, 'author_is_subscribed'):
+            instance.author.is_subscribed = instance.author_is_subscribed
+        return super().to_representation(instance)
+
     def get_is_favorited(self, obj):
+        if hasattr(obj, 'is_favorited'):
+            return obj.is_favorited
         request = self.context.get('request')
         return (
             request
@@ -253,6 +362,8 @@ class RecipeSerializer(serializers.ModelSerializer):
         )
 
     def get_is_in_shopping_cart(self, obj):
+        if hasattr(obj, 'is_in_shopping_cart'):
+            return obj.is_in_shopping_cart
         request = self.context.get('request')
         return (
             request
@@ -260,14 +371,17 @@ class RecipeSerializer(serializers.ModelSerializer):
             and obj.shopping_listed.filter(user=request.user).exists()
         )
 
+    @transaction.atomic
     def create(self, validated_data):
         ingredients_data = validated_data.pop('ingredients_in_recipe', [])
-        tags = self.initial_data.get('tags', [])
+        tags = validated_data.pop('tags', [])
         recipe = Recipe.objects.create(**validated_data)
         recipe.tags.set(tags)
         self.add_ingredients_in_recipe(recipe, ingredients_data)
+        prefetch_related_objects([recipe], 'ingredients_in_recipe__ingredient')
         return recipe
 
+    @transaction.atomic
     def update(self, instance, validated_data):
         for field in ['name', 'text', 'image', 'cooking_time']:
             setattr(
@@ -277,10 +391,15 @@ class RecipeSerializer(serializers.ModelSerializer):
             )
         instance.save()
         ingredients_data = validated_data.pop('ingredients_in_recipe', [])
-        tags = self.initial_data.get('tags', [])
+        tags = validated_data.pop('tags', [])
         instance.tags.set(tags)
-        instance.ingredients.clear()
-        self.add_ingredients_in_recipe(instance, ingredients_data)
+        added_amounts = self.update_ingredients_in_recipe(
+            instance, ingredients_data
+        )
+        ShoppingCartIngredient.objects.add_amounts(
+            instance.shopping_listed.values_list('user', flat=True),
+            added_amounts
+        )
         return instance
 
     def add_ingredients_in_recipe(self, recipe, ingredients_for_recipe):
@@ -294,10 +413,55 @@ class RecipeSerializer(serializers.ModelSerializer):
         ]
         IngredientInRecipe.objects.bulk_create(ingredients_to_create)
 
+    def update_ingredients_in_recipe(self, recipe, ingredients_for_recipe):
+        """
+        Приводит ингредиенты рецепта к переданным, меняя только разницу.
+
+        Новые ингредиенты добавляются, изменённые количества обновляются,
+        убранные ингредиенты удаляются. bulk_create и bulk_update
+        не отправляют сигналов, поэтому возвращается изменение количества
+        по добавленным и обновлённым ингредиентам для сумм списков покупок.
+        Удаление идёт через QuerySet, и суммы вычитают обработчики сигналов.
+        """
+        existing = {
+            item.ingredient_id: item
+            for item in recipe.ingredients_in_recipe.all()
+        }
+        amounts = {
+            ingredient['ingredient'].id: ingredient['amount']
+            for ingredient in ingredients_for_recipe
+        }
+        to_create = [
+            ingredient for ingredient in ingredients_for_recipe
+            if ingredient['ingredient'].id not in existing
+        ]
+        to_update = []
+        added_amounts = {
+            ingredient['ingredient'].id: ingredient['amount']
+            for ingredient in to_create
+        }
+        for ingredient_id, item in existing.items():
+            amount = amounts.get(ingredient_id, item.amount)
+            if item.amount != amount:
+                added_amounts[ingredient_id] = amount - item.amount
+                item.amount = amount
+                to_update.append(item)
+        to_delete = existing.keys() - amounts.keys()
+        if to_delete:
+            recipe.ingredients_in_recipe.filter(
+                ingredient__in=to_delete
+            ).delete()
+        if to_update:
+            IngredientInRecipe.objects.bulk_update(to_update, ('amount',))
+        self.add_ingredients_in_recipe(recipe, to_create)
+        return added_amounts
+
 
 class RecipeShortSerializer(serializers.ModelSerializer):
     """Класс сериализатора для рецептов без тегов и ингредиентов."""
 
+    image_variants = ImageVariantsField(source='image')
+
     class Meta:
         model = Recipe
-        fields = ('id', 'name', 'image', 'cooking_time')
+        fields = ('id', 'name', 'image', 'image_variants', 'cooking_time')
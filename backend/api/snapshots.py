@@ -0,0 +1,80 @@
+import gzip
+import threading
+
+from django.http import HttpResponse
+from django.utils.cache import patch_vary_headers
+from django.utils.decorators import method_decorator
+from django.views.decorators.http import condition
+
+from api.renderers import FastJSONRenderer
+from recipes.versions import reference_data_version
+
+
+def get_reference_data_etag(request, *args, **kwargs):
+    """
+    Слабый ETag по версии справочных данных.
+
+    Тела ответа в gzip и без сжатия различаются побайтно, но
+    равнозначны, поэтому один тег для обоих допустим только слабым.
+    """
+    if reference_data_version.is_shared():
+        return f'W/"{reference_data_version.get_token()}"'
+
+
+def get_reference_data_modified(request, *args, **kwargs):
+    if reference_data_version.is_shared():
+        return reference_data_version.get_modified()
+
+
+reference_data_condition = method_decorator(
+    condition(
+        etag_func=get_reference_data_etag,
+        last_modified_func=get_reference_data_modified
+    ),
+    name='dispatch'
+)
+
+
+class CatalogSnapshot:
+    """
+    Снимок полного справочника, отрендеренный в JSON и сжатый gzip.
+
+    Хранится в памяти процесса и пересобирается после смены версии
+    справочных данных, поэтому повторные запросы справочника
+    не обращаются к БД и не проходят через сериализатор. Без общего
+    кэша смену версии в другом воркере не увидеть, и снимок собирается
+    заново на каждый запрос; такой снимок не сжимается, чтобы
+    не тратить на это время каждого запроса.
+    """
+
+    def __init__(self, get_data):
+        self.get_data = get_data
+        self._lock = threading.Lock()
+        self._data = (None, b'', b'')
+
+    def build(self, version, compress=True):
+        content = FastJSONRenderer().render(self.get_data())
+        return version, content, gzip.compress(content) if compress else None
+
+    def get_snapshot(self):
+        if not reference_data_version.is_shared():
+            return self.build(None, compress=False)
+        version = reference_data_version.get_token()
+        if self._data[0] != version:
+            with self._lock:
+                if self._data[0] != version:
+                    self._data = self.build(version)
+        return self._data
+
+    def get_response(self, request):
+        _, content, compressed_content = self.get_snapshot()
+        accept_encoding = request.META.get('HTTP_ACCEPT_ENCODING', '')
+        if compressed_content is not None and 'gzip' in accept_encoding:
+            response = HttpResponse(
+                compressed_content, content_type='application/json'
+            )
+            response['Content-Encoding'] = 'gzip'
+        else:
+            response = HttpResponse(content, content_type='application/json')
+        patch_vary_headers(response, ('Accept-Encoding',))
+        return response
@@ -0,0 +1,101 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from recipes.models import Ingredient, IngredientInRecipe, Recipe, Tag
+
+User = get_user_model()
+
+RECIPES_COUNT = 60
+INGREDIENTS_PER_RECIPE = 3
+# COUNT(*), рецепты с авторами, теги, ингредиенты рецептов и ингредиенты.
+LIST_QUERIES = 5
+DETAIL_QUERIES = 4
+
+
+class RecipeQueriesTest(APITestCase):
+    """
+    Число запросов к БД для списка и карточки рецепта.
+
+    Оно не зависит от размера страницы и одинаково для анонимного
+    и авторизованного пользователя.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(
+            username='author', email='author@example.com', password='pass'
+        )
+        cls.reader = User.objects.create_user(
+            username='reader', email='reader@example.com', password='pass'
+        )
+        tags = [
+            Tag.objects.create(name=f'Тег {index}', slug=f'tag-{index}')
+            for index in range(2)
+        ]
+        ingredients = Ingredient.objects.bulk_create(
+            Ingredient(name=f'Ингредиент {index}', measurement_unit='г')
+            for index in range(INGREDIENTS_PER_RECIPE * 2)
+        )
+        recipes = Recipe.objects.bulk_create(
+            Recipe(
+                author=cls.author,
+                name=f'Рецепт {index}',
+                text='Описание',
+                image='recipes/images/test.png',
+                cooking_time=10
+            )
+            for index in range(RECIPES_COUNT)
+        )
+        Recipe.tags.through.objects.bulk_create(
+            Recipe.tags.through(recipe=recipe, tag=tag)
+            for recipe in recipes
+            for tag in tags
+        )
+        IngredientInRecipe.objects.bulk_create(
+            IngredientInRecipe(recipe=recipe, ingredient=ingredient, amount=5)
+            for index, recipe in enumerate(recipes)
+            for ingredient in ingredients[
+                index % 2:index % 2 + INGREDIENTS_PER_RECIPE
+            ]
+        )
+        cls.recipe = recipes[0]
+
+    def assert_list_queries(self):
+        for limit in (2, 6, 50):
+            with self.subTest(limit=limit):
+                cache.clear()
+                with self.assertNumQueries(LIST_QUERIES):
+                    response = self.client.get(
+                        reverse('recipes-list'), {'limit': limit}
+                    )
+                self.assertEqual(response.status_code, status.HTTP_200_OK)
+                self.assertEqual(len(response.data['results']), limit)
+                self.assertEqual(response.data['count'], RECIPES_COUNT)
+
+    def assert_detail_queries(self):
+        cache.clear()
+        with self.assertNumQueries(DETAIL_QUERIES):
+            response = self.client.get(
+                reverse('recipes-detail', args=(self.recipe.id,))
+            )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            len(response.data['ingredients']), INGREDIENTS_PER_RECIPE
+        )
+
+    def test_anonymous_list(self):
+        self.assert_list_queries()
+
+    def test_anonymous_detail(self):
+        self.assert_detail_queries()
+
+    def test_authenticated_list(self):
+        self.client.force_authenticate(self.reader)
+        self.assert_list_queries()
+
+    def test_authenticated_detail(self):
+        self.client.force_authenticate(self.reader)
+        self.assert_detail_queries()
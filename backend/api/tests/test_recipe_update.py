@@ -0,0 +1,162 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.db import IntegrityError
+from django.urls import reverse
+from rest_framework import serializers, status
+from rest_framework.test import APITestCase
+
+from api.serializers import RecipeSerializer
+from recipes.models import (
+    Ingredient,
+    IngredientInRecipe,
+    Recipe,
+    ShoppingCartIngredient,
+    ShoppingList,
+    Tag,
+)
+
+User = get_user_model()
+
+# Рецепт с тегами, ингредиенты и теги запроса по id, точки сохранения,
+# обновление рецепта, текущие теги и ингредиенты рецепта, затем рецепт
+# для ответа с тегами, ингредиентами в рецепте и самими ингредиентами.
+NO_CHANGE_QUERIES = 13
+# Плюс обновление количества, пользователи со списком покупок
+# и изменение сумм в нём.
+CHANGED_AMOUNT_QUERIES = 17
+# Плюс вставка ингредиента, пользователи со списком покупок
+# и добавление его в суммы.
+ADDED_QUERIES = 17
+# Плюс удаление ингредиента, пользователи со списком покупок,
+# вычитание из сумм и удаление обнулившейся строки.
+REMOVED_QUERIES = 18
+
+
+class RecipeUpdateTest(APITestCase):
+    """Обновление рецепта: число запросов и откат при ошибках."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(
+            username='author', email='author@example.com', password='pass'
+        )
+        cls.buyer = User.objects.create_user(
+            username='buyer', email='buyer@example.com', password='pass'
+        )
+        cls.tag = Tag.objects.create(name='Обед', slug='lunch')
+        cls.ingredients = Ingredient.objects.bulk_create(
+            Ingredient(name=f'Ингредиент {index}', measurement_unit='г')
+            for index in range(5)
+        )
+        cls.recipe = Recipe.objects.create(
+            author=cls.author,
+            name='Рецепт',
+            text='Описание',
+            image='recipes/images/test.png',
+            cooking_time=10
+        )
+        cls.recipe.tags.set([cls.tag])
+        IngredientInRecipe.objects.bulk_create(
+            IngredientInRecipe(
+                recipe=cls.recipe, ingredient=ingredient, amount=10
+            )
+            for ingredient in cls.ingredients[:3]
+        )
+        ShoppingList.objects.create(user=cls.buyer, recipe=cls.recipe)
+
+    def setUp(self):
+        self.client.force_authenticate(self.author)
+        self.url = reverse('recipes-detail', args=(self.recipe.id,))
+
+    def get_payload(self, amounts):
+        return {
+            'name': 'Рецепт',
+            'text': 'Описание',
+            'cooking_time': 10,
+            'tags': [self.tag.id],
+            'ingredients': [
+                {'id': self.ingredients[index].id, 'amount': amount}
+                for index, amount in amounts.items()
+            ]
+        }
+
+    def get_amounts(self):
+        return dict(
+            self.recipe.ingredients_in_recipe.values_list(
+                'ingredient', 'amount'
+            )
+        )
+
+    def get_cart_amounts(self):
+        return dict(
+            ShoppingCartIngredient.objects.filter(
+                user=self.buyer
+            ).values_list('ingredient', 'amount')
+        )
+
+    def assert_update(self, amounts, queries):
+        with self.assertNumQueries(queries):
+            response = self.client.patch(
+                self.url, self.get_payload(amounts), format='json'
+            )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        expected = {
+            self.ingredients[index].id: amount
+            for index, amount in amounts.items()
+        }
+        self.assertEqual(
+            {
+                item['id']: item['amount']
+                for item in response.data['ingredients']
+            },
+            expected
+        )
+        self.assertEqual(self.get_amounts(), expected)
+        self.assertEqual(self.get_cart_amounts(), expected)
+
+    def test_no_change(self):
+        self.assert_update({0: 10, 1: 10, 2: 10}, NO_CHANGE_QUERIES)
+
+    def test_changed_amount(self):
+        self.assert_update({0: 10, 1: 25, 2: 10}, CHANGED_AMOUNT_QUERIES)
+
+    def test_added_ingredient(self):
+        self.assert_update({0: 10, 1: 10, 2: 10, 3: 5}, ADDED_QUERIES)
+
+    def test_removed_ingredient(self):
+        self.assert_update({0: 10, 1: 10}, REMOVED_QUERIES)
+
+    def assert_unchanged(self):
+        self.recipe.refresh_from_db()
+        self.assertEqual(self.recipe.name, 'Рецепт')
+        self.assertEqual(
+            list(self.recipe.tags.values_list('id', flat=True)),
+            [self.tag.id]
+        )
+        expected = {ingredient.id: 10 for ingredient in self.ingredients[:3]}
+        self.assertEqual(self.get_amounts(), expected)
+        self.assertEqual(self.get_cart_amounts(), expected)
+
+    def test_rollback_on_validation_error(self):
+        payload = self.get_payload({0: 10, 3: 5})
+        payload['name'] = 'Новое название'
+        with mock.patch.object(
+            RecipeSerializer,
+            'add_ingredients_in_recipe',
+            side_effect=serializers.ValidationError('Ошибка.')
+        ):
+            response = self.client.patch(self.url, payload, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assert_unchanged()
+
+    def test_rollback_on_database_error(self):
+        payload = self.get_payload({0: 10, 3: 5})
+        payload['name'] = 'Новое название'
+        with mock.patch.object(
+            IngredientInRecipe.objects,
+            'bulk_create',
+            side_effect=IntegrityError
+        ), self.assertRaises(IntegrityError):
+            self.client.patch(self.url, payload, format='json')
+        self.assert_unchanged()
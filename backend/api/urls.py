@@ -1,9 +1,13 @@
+from django.conf import settings
 from django.urls import include, path
 from rest_framework.routers import DefaultRouter
 
+from api import async_views
 from api.views import (
     AvatarAPIView,
+    CacheStatsAPIView,
     CustomUserViewSet,
+    DatabaseStatsAPIView,
     IngredientViewSet,
     RecipeViewSet,
     TagViewSet,
@@ -20,7 +24,13 @@ router = DefaultRouter()
 for url_prefix, view_set, base_name in router_constructor:
     router.register(url_prefix, view_set, basename=base_name)
 
-urlpatterns = [
+async_urlpatterns = [
+    path('recipes/', async_views.recipe_list),
+    path('recipes/<int:pk>/', async_views.recipe_detail),
+    path('ingredients/', async_views.ingredient_list)
+]
+
+urlpatterns = (async_urlpatterns if settings.ASYNC_READ_PATH else []) + [
     path('', include(router.urls)),
     path(
         'users/me/',
@@ -32,5 +42,11 @@ urlpatterns = [
         name='set_password'
     ),
     path('users/me/avatar/', AvatarAPIView.as_view(), name='avatar'),
+    path(
+        'cache-stats/',
+        CacheStatsAPIView.as_view(),
+        name='cache_stats'
+    ),
+    path('db-stats/', DatabaseStatsAPIView.as_view(), name='db_stats'),
     path('auth/', include('djoser.urls.authtoken'))
 ]
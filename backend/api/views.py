@@ -1,42 +1,104 @@
 from django.contrib.auth import get_user_model
-from django.db.models import Count, Sum
-from django.http import HttpResponse
+from django.db.models import Exists, OuterRef, Prefetch, Value
+from django.http import StreamingHttpResponse
 from django.shortcuts import get_object_or_404
 from django_filters.rest_framework import DjangoFilterBackend
 from djoser.views import UserViewSet
 from rest_framework import status, viewsets
 from rest_framework.decorators import action
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.filters import OrderingFilter
+from rest_framework.permissions import IsAdminUser, IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
+from api.caches import AnonymousResponseCache
 from api.filters import CustomSearchFilter, RecipeFilter
-from api.permissions import IsAuthorOrReadOnly
+from api.permissions import IsAuthorOrReadOnly, IsMetricsClient
+from api.renderers import (
+    PrometheusRenderer,
+    ShoppingCartCSVRenderer,
+    ShoppingCartJSONRenderer,
+    ShoppingCartTextRenderer,
+)
 from api.serializers import (
     AvatarSerializer,
+    CookableRecipesQuerySerializer,
     FavoriteSerializer,
     IngredientSerializer,
     RecipeSerializer,
+    RecipesLimitSerializer,
     ShoppingListSerializer,
     SubscriptionSerializer,
     TagSerializer,
     UserRecipeSerializer,
 )
+from api.snapshots import CatalogSnapshot, reference_data_condition
+from core.constants import (
+    MAX_INGREDIENT_SEARCH_RESULTS,
+    RECIPE_RESPONSE_CACHE_TIMEOUT,
+)
+from core.db import get_pool_stats
+from core.metrics import render_request_metrics, request_metrics
 from recipes.models import (
     Favorite,
     Ingredient,
-    IngredientInRecipe,
     Recipe,
     ShoppingList,
     Tag,
 )
+from recipes.search import (
+    CookableRecipesQuery,
+    cookable_index,
+    ingredient_index,
+)
+from recipes.versions import recipe_data_version, reference_data_version
+from users.models import Subscription
 
 User = get_user_model()
 
 
+def get_recipe_read_queryset(user):
+    """
+    Queryset для чтения рецептов с постоянным числом запросов к БД.
+
+    Флаги избранного, списка покупок и подписки на автора вычисляются
+    подзапросами Exists, автор и ингредиенты загружаются заранее.
+    """
+    queryset = Recipe.objects.select_related('author').prefetch_related(
+        'tags',
+        'ingredients_in_recipe__ingredient'
+    )
+    if not user.is_authenticated:
+        return queryset.annotate(
+            is_favorited=Value(False),
+            is_in_shopping_cart=Value(False),
+            author_is_subscribed=Value(False)
+        )
+    return queryset.annotate(
+        is_favorited=Exists(
+            Favorite.objects.filter(user=user, recipe=OuterRef('pk'))
+        ),
+        is_in_shopping_cart=Exists(
+            ShoppingList.objects.filter(user=user, recipe=OuterRef('pk'))
+        ),
+        author_is_subscribed=Exists(
+            Subscription.objects.filter(
+                subscriber=user,
+                subscription=OuterRef('author')
+            )
+        )
+    )
+
+
 class CustomUserViewSet(UserViewSet):
     """Класс для представления пользователя."""
 
+    keyset_ordering = ('username',)
+    filter_backends = (OrderingFilter,)
+    ordering_fields = ('username', 'recipes_count', 'subscribers_count')
+    ordering = ('username',)
+    ordering_query_params = (OrderingFilter.ordering_param,)
+
     @action(
         detail=False,
         permission_classes=(IsAuthenticated,)
@@ -52,9 +114,7 @@ class CustomUserViewSet(UserViewSet):
     def subscribe(self, request, id=None):
         subscriber = request.user
         author = get_object_or_404(
-            User.objects.annotate(
-                recipes_count=Count('author_recipes')
-            ),
+            self.get_authors_queryset(User.objects.all()),
             id=id
         )
         serializer = SubscriptionSerializer(
@@ -62,7 +122,8 @@ class CustomUserViewSet(UserViewSet):
             context={'request': request}
         )
         serializer.is_valid(raise_exception=True)
-        serializer.save()
+        serializer.save(subscription=author)
+        author.refresh_from_db(fields=('subscribers_count',))
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
     @subscribe.mapping.delete
@@ -88,11 +149,9 @@ class CustomUserViewSet(UserViewSet):
     )
     def subscriptions(self, request):
         subscriber = request.user
-        queryset = User.objects.filter(
-            subscribers__subscriber=subscriber
-        ).annotate(
-            recipes_count=Count('author_recipes')
-        )
+        queryset = self.filter_queryset(self.get_authors_queryset(
+            User.objects.filter(subscribers__subscriber=subscriber)
+        ))
         pages = self.paginate_queryset(queryset)
         serializer = UserRecipeSerializer(
             pages,
@@ -101,6 +160,33 @@ class CustomUserViewSet(UserViewSet):
         )
         return self.get_paginated_response(serializer.data)
 
+    def get_recipes_limit(self):
+        serializer = RecipesLimitSerializer(data=self.request.query_params)
+        serializer.is_valid(raise_exception=True)
+        return serializer.validated_data.get('recipes_limit')
+
+    def get_authors_queryset(self, queryset):
+        """
+        Авторы с первыми recipes_limit рецептами.
+
+        Рецепты всех авторов страницы загружаются одним запросом:
+        срез в Prefetch выполняется оконной функцией ROW_NUMBER
+        с разбиением по автору.
+        """
+        recipes = Recipe.objects.all()
+        recipes_limit = self.get_recipes_limit()
+        if recipes_limit is not None:
+            recipes = recipes[:recipes_limit]
+        return queryset.annotate(
+            is_subscribed=Value(True)
+        ).prefetch_related(
+            Prefetch(
+                'author_recipes',
+                queryset=recipes,
+                to_attr='limited_recipes'
+            )
+        ).order_by('username')
+
 
 class AvatarAPIView(APIView):
     """Класс для представления аватара."""
@@ -119,14 +205,22 @@ class AvatarAPIView(APIView):
         return Response(status=status.HTTP_204_NO_CONTENT)
 
 
+@reference_data_condition
 class TagViewSet(viewsets.ReadOnlyModelViewSet):
     """Класс для представления тегов."""
 
     queryset = Tag.objects.all()
     serializer_class = TagSerializer
     pagination_class = None
+    snapshot = CatalogSnapshot(
+        lambda: TagSerializer(Tag.objects.all(), many=True).data
+    )
+
+    def list(self, request, *args, **kwargs):
+        return self.snapshot.get_response(request)
 
 
+@reference_data_condition
 class IngredientViewSet(viewsets.ReadOnlyModelViewSet):
     """класс для представления ингредиентов."""
 
@@ -135,6 +229,26 @@ class IngredientViewSet(viewsets.ReadOnlyModelViewSet):
     pagination_class = None
     filter_backends = (CustomSearchFilter, )
     search_fields = ('^name',)
+    snapshot = CatalogSnapshot(
+        lambda: IngredientSerializer(Ingredient.objects.all(), many=True).data
+    )
+
+    def list(self, request, *args, **kwargs):
+        name = request.query_params.get(CustomSearchFilter.search_param)
+        if not name or not name.strip():
+            return self.snapshot.get_response(request)
+        if ingredient_index.is_enabled():
+            return Response(
+                ingredient_index.search(
+                    name.strip(),
+                    limit=MAX_INGREDIENT_SEARCH_RESULTS
+                )
+            )
+        queryset = self.filter_queryset(
+            self.get_queryset()
+        )[:MAX_INGREDIENT_SEARCH_RESULTS]
+        serializer = self.get_serializer(queryset, many=True)
+        return Response(serializer.data)
 
 
 class RecipeViewSet(viewsets.ModelViewSet):
@@ -143,36 +257,111 @@ class RecipeViewSet(viewsets.ModelViewSet):
     permission_classes = (IsAuthorOrReadOnly, )
     filter_backends = (DjangoFilterBackend, )
     filterset_class = RecipeFilter
+    keyset_ordering = ('-pub_date', '-id')
+    ordering_query_params = ('ordering', 'search')
+    response_cache = AnonymousResponseCache(
+        'recipes',
+        (reference_data_version, recipe_data_version),
+        RECIPE_RESPONSE_CACHE_TIMEOUT
+    )
+
+    def list(self, request, *args, **kwargs):
+        return self.response_cache.get_response(
+            request, super().list, *args, **kwargs
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.response_cache.get_response(
+            request, super().retrieve, *args, **kwargs
+        )
+
+    def get_queryset(self):
+        if self.action in ('list', 'retrieve', 'cookable'):
+            return self.get_read_queryset()
+        return super().get_queryset()
+
+    def get_read_queryset(self):
+        return get_recipe_read_queryset(self.request.user)
 
     def perform_create(self, serializer):
         serializer.save(author=self.request.user)
 
-    @action(detail=False, permission_classes=(IsAuthenticated,))
+    def perform_update(self, serializer):
+        """
+        Ответ строится по рецепту, заново прочитанному через
+        get_recipe_read_queryset, чтобы ингредиенты, теги и флаги
+        не загружались отдельными запросами на каждый объект.
+        """
+        super().perform_update(serializer)
+        serializer.instance = self.get_read_queryset().get(
+            pk=serializer.instance.pk
+        )
+
+    @action(
+        detail=False,
+        permission_classes=(IsAuthenticated,),
+        renderer_classes=(
+            ShoppingCartTextRenderer,
+            ShoppingCartCSVRenderer,
+            ShoppingCartJSONRenderer
+        )
+    )
     def download_shopping_cart(self, request):
+        """
+        Потоковая выгрузка списка покупок.
+
+        Формат файла выбирается параметром format (txt, csv, json)
+        или заголовком Accept, по умолчанию txt.
+        """
         user = request.user
-        items = (
-            IngredientInRecipe.objects.filter(
-                recipe__shopping_listed__user=user
-            ).values(
-                'ingredient__name',
-                'ingredient__measurement_unit'
-            ).annotate(
-                amount=Sum('amount')
-            ).order_by('ingredient__name')
+        items = user.shopping_cart_ingredients.values(
+            'ingredient__name',
+            'ingredient__measurement_unit',
+            'amount'
+        ).order_by('ingredient__name')
+        renderer = request.accepted_renderer
+        response = StreamingHttpResponse(
+            renderer.stream(items.iterator()),
+            content_type=f'{renderer.media_type}; charset={renderer.charset}'
         )
-
-        shopping_list = ''
-        for item in items:
-            shopping_list += (
-                f"{item['ingredient__name']} "
-                f"- {item['amount']} "
-                f"{item['ingredient__measurement_unit']}\n"
-            )
-        response = HttpResponse(shopping_list, content_type='text/plain')
         response['Content-Disposition'] = (
-            'attachment; filename="Список покупок.txt"')
+            f'attachment; filename="{renderer.get_filename()}"')
         return response
 
+    @action(detail=False)
+    def cookable(self, request):
+        """
+        Рецепты, которые можно приготовить из имеющихся ингредиентов.
+
+        Рецепты упорядочены по числу недостающих ингредиентов и доле
+        имеющихся. Поиск выполняется по обратному индексу в памяти,
+        из БД читаются только рецепты страницы. Без общего кэша
+        с атомарным incr индекс отключён, и выборка группируется в БД.
+        """
+        query = CookableRecipesQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        ingredient_ids = set(query.validated_data['ingredients'])
+        max_missing = query.validated_data.get('max_missing')
+        if cookable_index.is_enabled():
+            recipes = cookable_index.find(ingredient_ids, max_missing)
+        else:
+            recipes = CookableRecipesQuery(ingredient_ids, max_missing)
+        page = self.paginator.paginate_queryset(recipes, request)
+        objects = self.get_queryset().in_bulk(
+            [recipe_id for recipe_id, _, _ in page]
+        )
+        page = [item for item in page if item[0] in objects]
+        recipe_ingredients = recipes.get_recipe_ingredients(objects)
+        data = self.get_serializer(
+            [objects[recipe_id] for recipe_id, _, _ in page], many=True
+        ).data
+        for item, (recipe_id, owned, total) in zip(data, page):
+            item['coverage'] = round(owned / total, 2)
+            item['missing_ingredients'] = sorted(
+                recipe_ingredients[recipe_id] - ingredient_ids
+            )
+        return self.paginator.get_paginated_response(data)
+
     @action(detail=True, url_path='get-link')
     def get_link(self, request, pk=None):
         recipe = self.get_object()
@@ -220,3 +409,49 @@ class RecipeViewSet(viewsets.ModelViewSet):
             return Response(status=status.HTTP_400_BAD_REQUEST)
         obj.delete()
         return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+class CacheStatsAPIView(APIView):
+    """Класс для представления статистики кэша ответов."""
+
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        return Response(
+            {'recipes': RecipeViewSet.response_cache.get_stats()}
+        )
+
+
+class DatabaseStatsAPIView(APIView):
+    """Класс для представления статистики подключений к БД."""
+
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        return Response(get_pool_stats())
+
+
+class MetricsAPIView(APIView):
+    """
+    Класс для представления метрик в формате Prometheus.
+
+    Адрес не проксируется шлюзом наружу. Кроме того, метрики отдаются
+    только с адресов METRICS_ALLOWED_IPS или по токену METRICS_TOKEN.
+    """
+
+    authentication_classes = ()
+    permission_classes = (IsMetricsClient,)
+    renderer_classes = (PrometheusRenderer,)
+
+    def get(self, request):
+        lines = render_request_metrics(request_metrics.collect())
+        cache_stats = RecipeViewSet.response_cache.get_stats()
+        for name in ('hits', 'misses'):
+            metric = f'foodgram_response_cache_{name}_total'
+            lines.append(f'# TYPE {metric} counter')
+            lines.append(f'{metric} {cache_stats[name]}')
+        for name, value in get_pool_stats().items():
+            if type(value) in (int, float):
+                lines.append(f'# TYPE foodgram_db_{name} gauge')
+                lines.append(f'foodgram_db_{name} {value}')
+        return Response('\n'.join(lines) + '\n')
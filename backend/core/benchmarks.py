@@ -0,0 +1,38 @@
+import json
+import statistics
+from pathlib import Path
+
+
+def get_percentiles(latencies):
+    """Перцентили p50, p95 и p99 в миллисекундах."""
+    if len(latencies) < 2:
+        value = round(latencies[0], 2) if latencies else 0
+        return {'p50': value, 'p95': value, 'p99': value}
+    quantiles = statistics.quantiles(latencies, n=100)
+    return {
+        'p50': round(quantiles[49], 2),
+        'p95': round(quantiles[94], 2),
+        'p99': round(quantiles[98], 2),
+    }
+
+
+def get_change(value, base):
+    """Изменение значения относительно базового, в процентах."""
+    if not base:
+        return 0
+    return (value / base - 1) * 100
+
+
+def load_baseline(path):
+    path = Path(path)
+    if not path.exists():
+        return {}
+    return json.loads(path.read_text())
+
+
+def save_baseline(path, results):
+    """Дописывает результаты в файл базового замера."""
+    path = Path(path)
+    path.write_text(json.dumps(
+        dict(load_baseline(path), **results), ensure_ascii=False, indent=2
+    ))
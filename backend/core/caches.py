@@ -0,0 +1,28 @@
+from django.core.cache import DEFAULT_CACHE_ALIAS, caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.cache.backends.memcached import BaseMemcachedCache
+from django.core.cache.backends.redis import RedisCache
+
+PROCESS_LOCAL_CACHES = (DummyCache, LocMemCache)
+ATOMIC_INCR_CACHES = (BaseMemcachedCache, RedisCache)
+
+
+def is_shared_cache(alias=DEFAULT_CACHE_ALIAS):
+    """
+    Общий ли кэш для всех процессов приложения.
+
+    У LocMemCache своя копия в каждом воркере, поэтому изменения,
+    записанные одним процессом, другие не видят.
+    """
+    return not isinstance(caches[alias], PROCESS_LOCAL_CACHES)
+
+
+def has_atomic_incr(alias=DEFAULT_CACHE_ALIAS):
+    """
+    Атомарен ли incr между процессами.
+
+    В Redis и Memcached это одна операция сервера, а файловый кэш
+    и кэш в БД читают и записывают значение отдельно.
+    """
+    return isinstance(caches[alias], ATOMIC_INCR_CACHES)
@@ -13,3 +13,29 @@ MAX_LENGTH_USER_NAME = 150
 MAX_LENGTH_EMAIL = 254
 
 MAX_LENGTH_SHORT_HASH = 8
+
+MAX_INGREDIENT_SEARCH_RESULTS = 50
+
+RECIPE_SEARCH_CONFIG = 'russian'
+MAX_RECIPE_SEARCH_TERMS = 10
+
+COOKABLE_INDEX_CHANGES_TIMEOUT = 60 * 60 * 24
+COOKABLE_INDEX_MAX_CHANGES = 1000
+COOKABLE_INDEX_REBUILD_INTERVAL = 60 * 60
+
+SHORT_CODE_LENGTH = 7
+SHORT_LINK_CACHE_TIMEOUT = 60 * 60 * 24
+
+RECIPE_RESPONSE_CACHE_TIMEOUT = 60 * 10
+
+MAX_PAGE_SIZE = 100
+
+MAX_TAGS_COUNT = 63
+
+IMAGE_VARIANT_SIZES = {'thumbnail': 160, 'card': 480, 'full': 1280}
+IMAGE_VARIANT_FORMATS = {'webp': 'WEBP', 'jpeg': 'JPEG'}
+IMAGE_VARIANT_QUALITY = 80
+
+METRICS_LATENCY_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10
+)
@@ -0,0 +1,48 @@
+import threading
+
+from django.db import connections
+
+_lock = threading.Lock()
+_stats = {'connections_opened': 0}
+
+
+def count_connection_opened():
+    with _lock:
+        _stats['connections_opened'] += 1
+
+
+def get_pool_stats(alias='default'):
+    """
+    Статистика подключений к БД текущего процесса.
+
+    Для пула psycopg возвращаются его счётчики: занятые и свободные
+    соединения, ожидающие запросы, число и суммарное время ожиданий.
+    Без пула доступно только число открытых процессом соединений.
+    """
+    connection = connections[alias]
+    settings_dict = connection.settings_dict
+    pool = getattr(connection, 'pool', None)
+    if pool is None:
+        conn_max_age = settings_dict['CONN_MAX_AGE']
+        return {
+            'mode': 'persistent' if conn_max_age else 'per_request',
+            'conn_max_age': conn_max_age,
+            'health_checks': settings_dict['CONN_HEALTH_CHECKS'],
+            'connections_opened': _stats['connections_opened'],
+        }
+    stats = pool.get_stats()
+    return {
+        'mode': 'pool',
+        'size': stats.get('pool_size', 0),
+        'min_size': stats.get('pool_min', 0),
+        'max_size': stats.get('pool_max', 0),
+        'in_use': stats.get('pool_size', 0) - stats.get('pool_available', 0),
+        'available': stats.get('pool_available', 0),
+        'waiting': stats.get('requests_waiting', 0),
+        'requests': stats.get('requests_num', 0),
+        'waits': stats.get('requests_queued', 0),
+        'wait_time_ms': stats.get('requests_wait_ms', 0),
+        'timeouts': stats.get('requests_errors', 0),
+        'connections_opened': stats.get('connections_num', 0),
+        'connections_lost': stats.get('connections_lost', 0),
+    }
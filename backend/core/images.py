@@ -0,0 +1,197 @@
+import logging
+import posixpath
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connection, transaction
+from PIL import Image, ImageOps
+
+from core.constants import (
+    IMAGE_VARIANT_FORMATS,
+    IMAGE_VARIANT_QUALITY,
+    IMAGE_VARIANT_SIZES,
+)
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_variant_name(name, variant, extension):
+    """Путь к уменьшенной копии рядом с исходным файлом."""
+    directory, filename = posixpath.split(name)
+    return posixpath.join(
+        directory, 'variants', f'{filename}.{variant}.{extension}'
+    )
+
+
+def get_variant_names(name):
+    return {
+        variant: {
+            extension: get_variant_name(name, variant, extension)
+            for extension in IMAGE_VARIANT_FORMATS
+        }
+        for variant in IMAGE_VARIANT_SIZES
+    }
+
+
+def get_variants_flag(field_name):
+    """Поле модели с признаком того, что копии изображения созданы."""
+    return f'{field_name}_variants_ready'
+
+
+def get_variant_urls(name, ready=True):
+    """
+    Адреса уменьшенных копий по вариантам и форматам.
+
+    Пока копии не созданы, вместо каждой из них отдаётся адрес
+    исходного изображения.
+    """
+    if not ready:
+        url = default_storage.url(name)
+        return {
+            variant: {extension: url for extension in IMAGE_VARIANT_FORMATS}
+            for variant in IMAGE_VARIANT_SIZES
+        }
+    return {
+        variant: {
+            extension: default_storage.url(variant_name)
+            for extension, variant_name in names.items()
+        }
+        for variant, names in get_variant_names(name).items()
+    }
+
+
+def render_variant(image, size, image_format):
+    variant = image.copy()
+    variant.thumbnail((size, size), Image.Resampling.LANCZOS)
+    if image_format == 'JPEG' and variant.mode != 'RGB':
+        background = Image.new('RGB', variant.size, 'white')
+        variant = variant.convert('RGBA')
+        background.paste(variant, mask=variant.getchannel('A'))
+        variant = background
+    buffer = BytesIO()
+    variant.save(
+        buffer,
+        image_format,
+        quality=IMAGE_VARIANT_QUALITY,
+        optimize=True
+    )
+    return buffer.getvalue()
+
+
+def generate_variants(name, force=False):
+    """
+    Создаёт уменьшенные копии изображения в WebP и JPEG.
+
+    Уже существующие копии пропускаются, если не передан force.
+    Возвращает число созданных файлов.
+    """
+    pending = [
+        (variant, extension, variant_name)
+        for variant, names in get_variant_names(name).items()
+        for extension, variant_name in names.items()
+        if force or not default_storage.exists(variant_name)
+    ]
+    if not pending:
+        return 0
+    with default_storage.open(name) as file, Image.open(file) as image:
+        image = ImageOps.exif_transpose(image)
+        for variant, extension, variant_name in pending:
+            content = render_variant(
+                image,
+                IMAGE_VARIANT_SIZES[variant],
+                IMAGE_VARIANT_FORMATS[extension]
+            )
+            if default_storage.exists(variant_name):
+                default_storage.delete(variant_name)
+            default_storage.save(variant_name, ContentFile(content))
+    return len(pending)
+
+
+def delete_variants(name):
+    for names in get_variant_names(name).values():
+        for variant_name in names.values():
+            default_storage.delete(variant_name)
+
+
+def delete_variants_on_commit(file):
+    if file:
+        name = file.name
+        transaction.on_commit(lambda: delete_variants(name))
+
+
+def mark_variants_ready(model, pk, field_name, name):
+    """Отмечает копии готовыми, если у объекта всё ещё то же изображение."""
+    model.objects.filter(pk=pk, **{field_name: name}).update(
+        **{get_variants_flag(field_name): True}
+    )
+
+
+def get_executor():
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=settings.IMAGE_VARIANTS_WORKERS,
+                    thread_name_prefix='image-variants'
+                )
+    return _executor
+
+
+def generate_variants_safely(model, pk, field_name, name):
+    try:
+        generate_variants(name)
+        mark_variants_ready(model, pk, field_name, name)
+    except Exception:
+        logger.exception('Не удалось создать копии изображения %s', name)
+
+
+def generate_variants_in_worker(*args):
+    try:
+        generate_variants_safely(*args)
+    finally:
+        connection.close()
+
+
+def update_variants(instance, field_name):
+    """
+    Обновляет уменьшенные копии после сохранения объекта.
+
+    Если имя файла не изменилось с момента чтения объекта из БД,
+    ничего не делается. Иначе признак готовности копий сбрасывается,
+    а после фиксации транзакции копии старого изображения удаляются
+    и создание новых ставится в очередь пула потоков, чтобы не
+    занимать обработку запроса. При IMAGE_VARIANTS_WORKERS = 0 копии
+    создаются сразу в текущем потоке. Признак готовности выставляется,
+    только когда созданы все копии.
+    """
+    name = getattr(instance, field_name).name or ''
+    loaded_names = getattr(instance, 'loaded_image_names', {})
+    if loaded_names.get(field_name) == name:
+        return
+    old_name = loaded_names.get(field_name)
+    loaded_names[field_name] = name
+    instance.loaded_image_names = loaded_names
+    model = type(instance)
+    flag = get_variants_flag(field_name)
+    if getattr(instance, flag) or old_name is not None:
+        setattr(instance, flag, False)
+        model.objects.filter(pk=instance.pk).update(**{flag: False})
+    if old_name:
+        transaction.on_commit(lambda: delete_variants(old_name))
+    if not name:
+        return
+    args = (model, instance.pk, field_name, name)
+    if settings.IMAGE_VARIANTS_WORKERS:
+        transaction.on_commit(
+            lambda: get_executor().submit(generate_variants_in_worker, *args)
+        )
+    else:
+        transaction.on_commit(lambda: generate_variants_safely(*args))
@@ -0,0 +1,219 @@
+import atexit
+import hashlib
+import logging
+import os
+import threading
+import time
+from bisect import bisect_left
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.cache import cache
+
+from core.caches import has_atomic_incr
+from core.constants import METRICS_LATENCY_BUCKETS
+
+logger = logging.getLogger(__name__)
+
+MICROSECONDS = 1_000_000
+
+
+class RequestMetrics:
+    """
+    Метрики запросов по маршрутам, общие для всех воркеров.
+
+    Каждый процесс копит приращения в памяти, а фоновый поток раз
+    в METRICS_FLUSH_INTERVAL секунд прибавляет их к счётчикам в общем
+    кэше, поэтому запрос не ждёт обращений к кэшу. Счётчики общие для
+    воркеров, поэтому они только увеличиваются через incr: set_many
+    затёр бы приращения других процессов. При интервале 0 метрики
+    передаются сразу в потоке запроса. Время хранится в микросекундах,
+    так как инкремент в кэше целочисленный.
+
+    Сложение работает только там, где incr атомарен между процессами
+    (см. has_atomic_incr). С другими кэшами счётчики остаются в памяти
+    процесса, и /metrics показывает метрики обработавшего его воркера.
+    """
+
+    fields = (
+        'count',
+        'duration_us',
+        'sql_queries',
+        'sql_us',
+        'response_bytes',
+    ) + tuple(
+        f'bucket_{index}' for index in range(len(METRICS_LATENCY_BUCKETS))
+    )
+
+    def __init__(self, prefix):
+        self.prefix = prefix
+        self._lock = threading.Lock()
+        self._pending = defaultdict(int)
+        self._series = {}
+        self._pid = None
+
+    @staticmethod
+    def is_shared():
+        return has_atomic_incr()
+
+    def get_series_id(self, labels):
+        return hashlib.md5(repr(labels).encode()).hexdigest()
+
+    def get_key(self, series_id, field):
+        return f'{self.prefix}:{series_id}:{field}'
+
+    def record(self, labels, duration, sql_queries, sql_time, response_bytes):
+        series_id = self.get_series_id(labels)
+        bucket = bisect_left(METRICS_LATENCY_BUCKETS, duration)
+        shared = self.is_shared()
+        if shared and settings.METRICS_FLUSH_INTERVAL > 0:
+            self.start()
+        with self._lock:
+            self._series[series_id] = labels
+            pending = self._pending
+            pending[series_id, 'count'] += 1
+            pending[series_id, 'duration_us'] += int(duration * MICROSECONDS)
+            pending[series_id, 'sql_queries'] += sql_queries
+            pending[series_id, 'sql_us'] += int(sql_time * MICROSECONDS)
+            pending[series_id, 'response_bytes'] += response_bytes
+            if bucket < len(METRICS_LATENCY_BUCKETS):
+                pending[series_id, f'bucket_{bucket}'] += 1
+        if shared and settings.METRICS_FLUSH_INTERVAL <= 0:
+            self.flush()
+
+    def start(self):
+        """
+        Запускает фоновую передачу метрик в текущем процессе.
+
+        Поток запускается заново после fork, а приращения, накопленные
+        до него родительским процессом, в дочернем отбрасываются.
+        """
+        pid = os.getpid()
+        if self._pid == pid:
+            return
+        with self._lock:
+            if self._pid == pid:
+                return
+            if self._pid is not None:
+                self._pending = defaultdict(int)
+            self._pid = pid
+            threading.Thread(
+                target=self.run, name='metrics-flush', daemon=True
+            ).start()
+        atexit.register(self.flush)
+
+    def run(self):
+        while True:
+            time.sleep(settings.METRICS_FLUSH_INTERVAL)
+            try:
+                self.flush()
+            except Exception:
+                logger.exception('Не удалось передать метрики в кэш')
+
+    def flush(self):
+        if not self.is_shared():
+            return
+        with self._lock:
+            pending, self._pending = self._pending, defaultdict(int)
+            series = dict(self._series)
+        if not pending:
+            return
+        registry_key = f'{self.prefix}:series'
+        registry = cache.get(registry_key) or {}
+        if not registry.keys() >= series.keys():
+            registry.update(series)
+            cache.set(registry_key, registry, None)
+        for (series_id, field), value in pending.items():
+            key = self.get_key(series_id, field)
+            try:
+                cache.incr(key, value)
+            except ValueError:
+                if not cache.add(key, value, None):
+                    cache.incr(key, value)
+
+    def collect(self):
+        """Список пар из меток маршрута и накопленных счётчиков."""
+        if not self.is_shared():
+            with self._lock:
+                registry = dict(self._series)
+                values = {
+                    self.get_key(series_id, field): value
+                    for (series_id, field), value in self._pending.items()
+                }
+        else:
+            self.flush()
+            registry = cache.get(f'{self.prefix}:series') or {}
+            values = cache.get_many([
+                self.get_key(series_id, field)
+                for series_id in registry
+                for field in self.fields
+            ])
+        return [
+            (
+                labels,
+                {
+                    field: values.get(self.get_key(series_id, field), 0)
+                    for field in self.fields
+                }
+            )
+            for series_id, labels in sorted(
+                registry.items(), key=lambda item: item[1]
+            )
+        ]
+
+
+def format_labels(labels):
+    escaped = (
+        (name, str(value).replace('\\', '\\\\').replace('"', '\\"')
+         .replace('\n', '\\n'))
+        for name, value in labels
+    )
+    return '{' + ','.join(f'{name}="{value}"' for name, value in escaped) + '}'
+
+
+def render_request_metrics(series):
+    """Метрики запросов в текстовом формате Prometheus."""
+    lines = [
+        '# HELP foodgram_http_request_duration_seconds '
+        'Время обработки запроса.',
+        '# TYPE foodgram_http_request_duration_seconds histogram',
+    ]
+    for labels, values in series:
+        cumulative = 0
+        for index, bound in enumerate(METRICS_LATENCY_BUCKETS):
+            cumulative += values[f'bucket_{index}']
+            lines.append(
+                'foodgram_http_request_duration_seconds_bucket'
+                f'{format_labels(labels + (("le", bound),))} {cumulative}'
+            )
+        lines.append(
+            'foodgram_http_request_duration_seconds_bucket'
+            f'{format_labels(labels + (("le", "+Inf"),))} {values["count"]}'
+        )
+        lines.append(
+            'foodgram_http_request_duration_seconds_sum'
+            f'{format_labels(labels)} '
+            f'{values["duration_us"] / MICROSECONDS}'
+        )
+        lines.append(
+            'foodgram_http_request_duration_seconds_count'
+            f'{format_labels(labels)} {values["count"]}'
+        )
+    counters = (
+        ('foodgram_http_sql_queries_total',
+         'Число SQL-запросов.', 'sql_queries', 1),
+        ('foodgram_http_sql_duration_seconds_total',
+         'Время выполнения SQL-запросов.', 'sql_us', MICROSECONDS),
+        ('foodgram_http_response_size_bytes_total',
+         'Размер тел ответов.', 'response_bytes', 1),
+    )
+    for name, help_text, field, divisor in counters:
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} counter')
+        for labels, values in series:
+            value = values[field] / divisor if divisor > 1 else values[field]
+            lines.append(f'{name}{format_labels(labels)} {value}')
+    return lines
+
+
+request_metrics = RequestMetrics('metrics')
@@ -0,0 +1,165 @@
+import hashlib
+import time
+from contextlib import ExitStack, contextmanager
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+
+from core.caches import is_shared_cache
+from core.metrics import request_metrics
+from core.routers import replica_reads_allowed
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+
+class ReplicaRoutingMiddleware:
+    """
+    Направляет чтение с реплик и закрепляет автора изменений за основной БД.
+
+    GET-запросы к REPLICA_READ_PATHS читают с реплик. После изменяющего
+    запроса клиент с тем же токеном READ_YOUR_WRITES_TIMEOUT секунд
+    читает с основной БД и видит свои изменения, даже если реплики
+    ещё не догнали её. Закрепление хранится в кэше и должно быть видно
+    всем воркерам, поэтому без общего кэша все запросы идут в основную
+    БД.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        pin_key = self.get_pin_key(request)
+        use_replicas = self.can_use_replicas(request) and not (
+            pin_key and cache.get(pin_key)
+        )
+        token = replica_reads_allowed.set(use_replicas)
+        try:
+            response = self.get_response(request)
+        finally:
+            replica_reads_allowed.reset(token)
+        if self.should_pin(request, pin_key):
+            cache.set(pin_key, True, settings.READ_YOUR_WRITES_TIMEOUT)
+        return response
+
+    async def __acall__(self, request):
+        pin_key = self.get_pin_key(request)
+        use_replicas = self.can_use_replicas(request) and not (
+            pin_key and await cache.aget(pin_key)
+        )
+        token = replica_reads_allowed.set(use_replicas)
+        try:
+            response = await self.get_response(request)
+        finally:
+            replica_reads_allowed.reset(token)
+        if self.should_pin(request, pin_key):
+            await cache.aset(
+                pin_key, True, settings.READ_YOUR_WRITES_TIMEOUT
+            )
+        return response
+
+    def can_use_replicas(self, request):
+        return (
+            request.method in SAFE_METHODS
+            and request.path.startswith(settings.REPLICA_READ_PATHS)
+            and is_shared_cache()
+        )
+
+    def should_pin(self, request, pin_key):
+        return (
+            request.method not in SAFE_METHODS
+            and pin_key is not None
+            and is_shared_cache()
+        )
+
+    def get_pin_key(self, request):
+        authorization = request.META.get('HTTP_AUTHORIZATION')
+        if not authorization:
+            return None
+        return 'primary_pin:' + hashlib.md5(
+            authorization.encode()
+        ).hexdigest()
+
+
+class MetricsMiddleware:
+    """
+    Собирает метрики запросов по маршрутам.
+
+    Маршрут определяется именем URL и действием viewset. Для каждого
+    запроса учитываются время обработки, число и время SQL-запросов,
+    выполненных в потоке запроса, и размер тела ответа.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        start = time.perf_counter()
+        with self.count_queries() as sql:
+            response = self.get_response(request)
+        self.record(request, response, start, sql)
+        return response
+
+    async def __acall__(self, request):
+        start = time.perf_counter()
+        with self.count_queries() as sql:
+            response = await self.get_response(request)
+        self.record(request, response, start, sql)
+        return response
+
+    @contextmanager
+    def count_queries(self):
+        sql = {'queries': 0, 'time': 0.0}
+
+        def count(execute, sql_text, params, many, context):
+            start = time.perf_counter()
+            try:
+                return execute(sql_text, params, many, context)
+            finally:
+                sql['queries'] += 1
+                sql['time'] += time.perf_counter() - start
+
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(count))
+            yield sql
+
+    def record(self, request, response, start, sql):
+        request_metrics.record(
+            self.get_labels(request, response),
+            time.perf_counter() - start,
+            sql['queries'],
+            sql['time'],
+            0 if response.streaming else len(response.content)
+        )
+
+    def get_labels(self, request, response):
+        match = request.resolver_match
+        if match is None:
+            route, action = 'unmatched', ''
+        else:
+            route = match.view_name or match._func_path
+            action = getattr(match.func, 'actions', {}).get(
+                request.method.lower(), ''
+            )
+        return (
+            ('route', route),
+            ('action', action),
+            ('method', request.method),
+            ('status', f'{response.status_code // 100}xx'),
+        )
@@ -0,0 +1,48 @@
+from django.db import models
+
+
+class CounterField(models.PositiveIntegerField):
+    """
+    Поле денормализованного счётчика.
+
+    Счётчик меняется только атомарными обновлениями через F()
+    в QuerySet.update. При сохранении существующего объекта столбец
+    присваивается сам себе, поэтому устаревшее значение из памяти
+    не перезаписывает счётчик, а update_fields в сигналах остаётся
+    таким, каким его передали в save(). Если строки уже нет и save()
+    выполняет INSERT, записывается значение из объекта.
+    """
+
+    def __init__(self, *args, **kwargs):
+        kwargs.setdefault('default', 0)
+        kwargs.setdefault('editable', False)
+        super().__init__(*args, **kwargs)
+
+    def pre_save(self, model_instance, add):
+        if add:
+            return super().pre_save(model_instance, add)
+        return models.F(self.attname)
+
+
+class LoadedImagesMixin:
+    """
+    Запоминает имена файлов изображений в том виде, в каком их прочитали
+    из БД.
+
+    Поля перечисляются в variant_image_fields. Сравнение с сохранённым
+    именем позволяет после save() понять, сменилось ли изображение,
+    без дополнительного запроса к БД. У только что созданного объекта
+    записей нет.
+    """
+
+    variant_image_fields = ()
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance.loaded_image_names = {
+            name: value or ''
+            for name, value in zip(field_names, values)
+            if name in cls.variant_image_fields
+        }
+        return instance
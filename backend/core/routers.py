@@ -0,0 +1,31 @@
+import random
+from contextvars import ContextVar
+
+from django.conf import settings
+from rest_framework.authtoken.models import Token
+
+replica_reads_allowed = ContextVar('replica_reads_allowed', default=False)
+
+
+class PrimaryReplicaRouter:
+    """
+    Маршрутизатор чтения на реплики БД.
+
+    Читать с реплик разрешено только внутри запросов, которые пометил
+    ReplicaRoutingMiddleware, поэтому фоновые задачи, команды
+    и изменяющие запросы работают с основной БД. Токены всегда читаются
+    с основной БД, чтобы только что выданный токен сразу действовал.
+    """
+
+    primary_models = (Token,)
+
+    def db_for_read(self, model, **hints):
+        if not replica_reads_allowed.get() or model in self.primary_models:
+            return 'default'
+        return random.choice(settings.DATABASE_REPLICAS)
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
@@ -0,0 +1,60 @@
+import string
+
+from core.constants import SHORT_CODE_LENGTH
+
+ALPHABET = string.digits + string.ascii_letters
+BASE = len(ALPHABET)
+MODULUS = BASE ** SHORT_CODE_LENGTH
+# Множитель взаимно прост с основанием, поэтому перестановка обратима.
+MULTIPLIER = 2654435761
+OFFSET = 1580030168237
+INVERSE_MULTIPLIER = pow(MULTIPLIER, -1, MODULUS)
+
+
+def to_digits(value):
+    digits = []
+    for _ in range(SHORT_CODE_LENGTH):
+        value, digit = divmod(value, BASE)
+        digits.append(digit)
+    return digits
+
+
+def from_digits(digits):
+    value = 0
+    for digit in reversed(digits):
+        value = value * BASE + digit
+    return value
+
+
+def mix(value):
+    return (value * MULTIPLIER + OFFSET) % MODULUS
+
+
+def unmix(value):
+    return (value - OFFSET) * INVERSE_MULTIPLIER % MODULUS
+
+
+def encode_short_code(number):
+    """
+    Короткий код фиксированной длины для натурального числа.
+
+    Число перемешивается обратимой перестановкой по модулю BASE ** длина:
+    аффинное преобразование, разворот разрядов и ещё одно аффинное
+    преобразование. Поэтому соседние id дают непохожие коды, а коды
+    разных чисел никогда не совпадают.
+    """
+    value = mix(from_digits(list(reversed(to_digits(mix(number))))))
+    return ''.join(ALPHABET[digit] for digit in reversed(to_digits(value)))
+
+
+def decode_short_code(code):
+    """Число по короткому коду или None, если код некорректен."""
+    if len(code) != SHORT_CODE_LENGTH:
+        return None
+    digits = [ALPHABET.find(char) for char in reversed(code)]
+    if min(digits) < 0:
+        return None
+    value = unmix(from_digits(list(reversed(to_digits(
+        unmix(from_digits(digits))
+    )))))
+    return value or None
@@ -0,0 +1,9 @@
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+from core.db import count_connection_opened
+
+
+@receiver(connection_created)
+def count_database_connection(**kwargs):
+    count_connection_opened()
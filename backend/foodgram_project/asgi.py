@@ -3,6 +3,9 @@ ASGI config for foodgram_project project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+With ASYNC_READ_PATH=True the hot read endpoints (recipe list and
+detail, ingredient search, short links) are served by async views.
+
 For more information on this file, see
 https://docs.djangoproject.com/en/5.1/howto/deployment/asgi/
 """
@@ -1,7 +1,10 @@
+import importlib.util
 import os
 import secrets
 from pathlib import Path
 
+from django.core.exceptions import ImproperlyConfigured
+
 BASE_DIR = Path(__file__).resolve().parent.parent
 
 SECRET_KEY = os.getenv('SECRET_KEY', secrets.token_urlsafe(100))
@@ -73,12 +76,82 @@ db_postgresql = {
         'USER': os.getenv('POSTGRES_USER', 'django'),
         'PASSWORD': os.getenv('POSTGRES_PASSWORD', ''),
         'HOST': os.getenv('DB_HOST', ''),
-        'PORT': os.getenv('DB_PORT', 5432)
+        'PORT': os.getenv('DB_PORT', 5432),
+        'CONN_MAX_AGE': int(os.getenv('DB_CONN_MAX_AGE', 0)),
+        'CONN_HEALTH_CHECKS': os.getenv(
+            'DB_CONN_HEALTH_CHECKS', 'True'
+        ) == 'True'
     }
 }
 
+if os.getenv('DB_POOL', 'False') == 'True':
+    if not DEBUG and importlib.util.find_spec('psycopg_pool') is None:
+        raise ImproperlyConfigured(
+            'DB_POOL=True требует пакета psycopg[pool].'
+        )
+    db_postgresql['default']['CONN_MAX_AGE'] = 0
+    db_postgresql['default']['OPTIONS'] = {
+        'pool': {
+            'min_size': int(os.getenv('DB_POOL_MIN_SIZE', 2)),
+            'max_size': int(os.getenv('DB_POOL_MAX_SIZE', 10)),
+            'timeout': int(os.getenv('DB_POOL_TIMEOUT', 10))
+        }
+    }
+
 DATABASES = db_sqlite if DEBUG else db_postgresql
 
+DATABASE_REPLICAS = []
+for index, replica in enumerate(
+    filter(None, os.getenv('DB_REPLICAS', '').split(',')), start=1
+):
+    replica_database = dict(DATABASES['default'], TEST={'MIRROR': 'default'})
+    if replica_database['ENGINE'].endswith('sqlite3'):
+        replica_database['NAME'] = BASE_DIR / replica
+    else:
+        replica_database['HOST'] = replica
+    DATABASES[f'replica_{index}'] = replica_database
+    DATABASE_REPLICAS.append(f'replica_{index}')
+
+if DATABASE_REPLICAS:
+    DATABASE_ROUTERS = ['core.routers.PrimaryReplicaRouter']
+    MIDDLEWARE.append('core.middleware.ReplicaRoutingMiddleware')
+
+REPLICA_READ_PATHS = (
+    '/api/recipes/',
+    '/api/ingredients/',
+    '/api/tags/',
+    '/api/users/',
+)
+
+METRICS_ENABLED = os.getenv('METRICS_ENABLED', 'True') == 'True'
+
+METRICS_FLUSH_INTERVAL = int(os.getenv('METRICS_FLUSH_INTERVAL', 5))
+
+METRICS_TOKEN = os.getenv('METRICS_TOKEN', '')
+
+METRICS_ALLOWED_IPS = [
+    network.strip()
+    for network in os.getenv('METRICS_ALLOWED_IPS', '127.0.0.1,::1').split(',')
+    if network.strip()
+]
+
+if METRICS_ENABLED:
+    MIDDLEWARE.insert(0, 'core.middleware.MetricsMiddleware')
+
+TOKEN_CACHE_TIMEOUT = int(os.getenv('TOKEN_CACHE_TIMEOUT', 300))
+
+READ_YOUR_WRITES_TIMEOUT = int(os.getenv('READ_YOUR_WRITES_TIMEOUT', 5))
+
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv(
+            'CACHE_BACKEND',
+            'django.core.cache.backends.locmem.LocMemCache'
+        ),
+        'LOCATION': os.getenv('CACHE_LOCATION', ''),
+    }
+}
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
@@ -101,15 +174,30 @@ REST_FRAMEWORK = {
         'rest_framework.permissions.IsAuthenticatedOrReadOnly',
     ],
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',
+        'api.authentication.CachedTokenAuthentication',
     ],
     'DEFAULT_PAGINATION_CLASS': 'api.paginations.PageLimitPagination',
     'PAGE_SIZE': 6,
     'DEFAULT_RENDERER_CLASSES': [
-        'rest_framework.renderers.JSONRenderer',
+        'api.renderers.FastJSONRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'api.parsers.FastJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
     ],
 }
 
+INGREDIENT_SEARCH_INDEX = os.getenv('INGREDIENT_SEARCH_INDEX', 'True') == 'True'
+
+PAGINATION_COUNT_CACHE_TIMEOUT = int(
+    os.getenv('PAGINATION_COUNT_CACHE_TIMEOUT', 0)
+)
+
+ASYNC_READ_PATH = os.getenv('ASYNC_READ_PATH', 'False') == 'True'
+
+IMAGE_VARIANTS_WORKERS = int(os.getenv('IMAGE_VARIANTS_WORKERS', 2))
+
 DJOSER = {
     'HIDE_USERS': False,
     'LOGIN_FIELD': 'email',
@@ -1,18 +1,36 @@
+from django.conf import settings
 from django.contrib import admin
-from django.shortcuts import get_object_or_404, redirect
+from django.http import Http404
+from django.shortcuts import redirect
 from django.urls import include, path
 
-from recipes.models import Recipe
+from api.views import MetricsAPIView
+from recipes.short_links import aresolve_short_link, resolve_short_link
 
 
 def redirect_short_url(request, short_path):
-    recipe = get_object_or_404(Recipe, short_hash=short_path)
-    url = request.build_absolute_uri(f'/recipes/{recipe.id}/')
+    recipe_id = resolve_short_link(short_path)
+    if recipe_id is None:
+        raise Http404('Нет рецепта с такой короткой ссылкой.')
+    url = request.build_absolute_uri(f'/recipes/{recipe_id}/')
+    return redirect(url)
+
+
+async def aredirect_short_url(request, short_path):
+    recipe_id = await aresolve_short_link(short_path)
+    if recipe_id is None:
+        raise Http404('Нет рецепта с такой короткой ссылкой.')
+    url = request.build_absolute_uri(f'/recipes/{recipe_id}/')
     return redirect(url)
 
 
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/', include('api.urls')),
-    path('s/<str:short_path>/', redirect_short_url)
+    path('metrics', MetricsAPIView.as_view(), name='metrics'),
+    path(
+        's/<str:short_path>/',
+        aredirect_short_url if settings.ASYNC_READ_PATH
+        else redirect_short_url
+    )
 ]
@@ -5,6 +5,7 @@ from recipes.models import (
     Ingredient,
     IngredientInRecipe,
     Recipe,
+    ShoppingCartIngredient,
     ShoppingList,
     Tag,
 )
@@ -37,15 +38,12 @@ class RecipeIngredientInline(admin.TabularInline):
 
 @admin.register(Recipe)
 class RecipeAdmin(admin.ModelAdmin):
-    list_display = ('name', 'author', 'favorited_count')
+    list_display = ('name', 'author', 'favorites_count')
+    list_select_related = ('author',)
     search_fields = ('name', 'author__username')
     list_filter = ('tags',)
     inlines = [RecipeIngredientInline]
 
-    @admin.display(description='Добавлений в избранное')
-    def favorited_count(self, obj):
-        return obj.favorited.count()
-
 
 @admin.register(Favorite)
 class FavoriteAdmin(admin.ModelAdmin):
@@ -57,4 +55,10 @@ class ShoppingListAdmin(admin.ModelAdmin):
     list_display = ('recipe', 'user')
 
 
+@admin.register(ShoppingCartIngredient)
+class ShoppingCartIngredientAdmin(admin.ModelAdmin):
+    list_display = ('user', 'ingredient', 'amount')
+    search_fields = ('user__username', 'ingredient__name')
+
+
 admin.site.empty_value_display = 'Не задано'
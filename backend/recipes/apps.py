@@ -1,7 +1,14 @@
 from django.apps import AppConfig
+from django.core import checks
 
 
 class RecipesConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'recipes'
     verbose_name = 'Рецепты и ингредиенты'
+
+    def ready(self):
+        import recipes.signals  # noqa: F401
+        from recipes.fulltext import check_search_index
+
+        checks.register(check_search_index, checks.Tags.database)
@@ -0,0 +1,183 @@
+import re
+
+from django.core import checks
+from django.db import connections
+from django.db.models import BooleanField, FloatField, Q
+from django.db.models.expressions import RawSQL
+
+from core.constants import MAX_RECIPE_SEARCH_TERMS, RECIPE_SEARCH_CONFIG
+
+WORD_PATTERN = re.compile(r'\w+')
+FTS_TABLE = 'recipes_recipe_fts'
+GIN_INDEX = 'recipes_recipe_search_vector_gin'
+
+POSTGRESQL_INSTALL = (
+    'ALTER TABLE recipes_recipe ADD COLUMN IF NOT EXISTS search_vector '
+    'tsvector GENERATED ALWAYS AS ('
+    f"setweight(to_tsvector('{RECIPE_SEARCH_CONFIG}'::regconfig, "
+    "coalesce(name, '')), 'A') || "
+    f"setweight(to_tsvector('{RECIPE_SEARCH_CONFIG}'::regconfig, "
+    "coalesce(text, '')), 'B')) STORED",
+    f'CREATE INDEX IF NOT EXISTS {GIN_INDEX} '
+    'ON recipes_recipe USING GIN (search_vector)',
+)
+POSTGRESQL_UNINSTALL = (
+    f'DROP INDEX IF EXISTS {GIN_INDEX}',
+    'ALTER TABLE recipes_recipe DROP COLUMN IF EXISTS search_vector',
+)
+SQLITE_INSTALL = (
+    f'CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5('
+    "name, text, content='recipes_recipe', content_rowid='id', "
+    "tokenize='unicode61 remove_diacritics 2')",
+    f'CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_insert '
+    'AFTER INSERT ON recipes_recipe BEGIN '
+    f'INSERT INTO {FTS_TABLE} (rowid, name, text) '
+    'VALUES (new.id, new.name, new.text); END',
+    f'CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_delete '
+    'AFTER DELETE ON recipes_recipe BEGIN '
+    f'INSERT INTO {FTS_TABLE} ({FTS_TABLE}, rowid, name, text) '
+    "VALUES ('delete', old.id, old.name, old.text); END",
+    f'CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_update '
+    'AFTER UPDATE OF name, text ON recipes_recipe BEGIN '
+    f'INSERT INTO {FTS_TABLE} ({FTS_TABLE}, rowid, name, text) '
+    "VALUES ('delete', old.id, old.name, old.text); "
+    f'INSERT INTO {FTS_TABLE} (rowid, name, text) '
+    'VALUES (new.id, new.name, new.text); END',
+    f"INSERT INTO {FTS_TABLE} ({FTS_TABLE}) VALUES ('rebuild')",
+)
+SQLITE_TRIGGERS = (
+    f'{FTS_TABLE}_insert',
+    f'{FTS_TABLE}_delete',
+    f'{FTS_TABLE}_update',
+)
+SQLITE_UNINSTALL = (
+    f'DROP TRIGGER IF EXISTS {FTS_TABLE}_insert',
+    f'DROP TRIGGER IF EXISTS {FTS_TABLE}_delete',
+    f'DROP TRIGGER IF EXISTS {FTS_TABLE}_update',
+    f'DROP TABLE IF EXISTS {FTS_TABLE}',
+)
+
+
+def install(schema_editor):
+    """
+    Создаёт полнотекстовый индекс рецептов по названию и описанию.
+
+    В PostgreSQL это генерируемый столбец tsvector с GIN-индексом,
+    в SQLite - внешняя таблица FTS5, которую обновляют триггеры.
+    Индекс обновляется самой БД при любом изменении рецепта.
+    Пересоздание таблицы рецептов в SQLite удаляет триггеры, поэтому
+    такие миграции должны вызывать install повторно.
+    """
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        statements = POSTGRESQL_INSTALL
+    elif vendor == 'sqlite':
+        statements = SQLITE_INSTALL
+    else:
+        return
+    for statement in statements:
+        schema_editor.execute(statement)
+
+
+def uninstall(schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        statements = POSTGRESQL_UNINSTALL
+    elif vendor == 'sqlite':
+        statements = SQLITE_UNINSTALL
+    else:
+        return
+    for statement in statements:
+        schema_editor.execute(statement)
+
+
+def check_search_index(app_configs=None, databases=None, **kwargs):
+    """
+    Проверяет, что в SQLite на месте триггеры полнотекстового индекса.
+
+    Без них индекс перестаёт обновляться, и поиск молча отдаёт
+    устаревшие результаты. БД, в которых индекс ещё не создан
+    миграцией, пропускаются.
+    """
+    errors = []
+    for alias in databases or ():
+        connection = connections[alias]
+        if connection.vendor != 'sqlite':
+            continue
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT name FROM sqlite_master WHERE name = %s '
+                "OR (type = 'trigger' AND tbl_name = 'recipes_recipe')",
+                (FTS_TABLE,)
+            )
+            names = {name for name, in cursor.fetchall()}
+        if FTS_TABLE not in names:
+            continue
+        missing = [name for name in SQLITE_TRIGGERS if name not in names]
+        if missing:
+            errors.append(checks.Error(
+                f'В БД {alias} нет триггеров полнотекстового индекса '
+                f'рецептов: {", ".join(missing)}.',
+                hint='Выполните python manage.py install_search_index.',
+                id='recipes.E001'
+            ))
+    return errors
+
+
+def get_terms(query):
+    return WORD_PATTERN.findall(query.lower())[:MAX_RECIPE_SEARCH_TERMS]
+
+
+def search_recipes(queryset, query):
+    """
+    Рецепты, в названии или описании которых есть все слова запроса.
+
+    Слова ищутся по началу, совпадения в названии весят больше,
+    чем в описании. Результат упорядочен по убыванию релевантности,
+    а при равной релевантности - как обычный список рецептов.
+    Для других БД выполняется поиск подстроки без ранжирования.
+    """
+    terms = get_terms(query)
+    if not terms:
+        return queryset.none()
+    vendor = connections[queryset.db].vendor
+    if vendor == 'postgresql':
+        params = (
+            RECIPE_SEARCH_CONFIG, ' & '.join(f'{term}:*' for term in terms)
+        )
+        match = RawSQL(
+            '"recipes_recipe"."search_vector" '
+            '@@ to_tsquery(%s::regconfig, %s)',
+            params,
+            output_field=BooleanField()
+        )
+        rank = RawSQL(
+            'ts_rank("recipes_recipe"."search_vector", '
+            'to_tsquery(%s::regconfig, %s))',
+            params,
+            output_field=FloatField()
+        )
+    elif vendor == 'sqlite':
+        params = (' '.join(f'"{term}"*' for term in terms),)
+        match = RawSQL(
+            f'"recipes_recipe"."id" IN (SELECT rowid FROM {FTS_TABLE} '
+            f'WHERE {FTS_TABLE} MATCH %s)',
+            params,
+            output_field=BooleanField()
+        )
+        rank = RawSQL(
+            f'(SELECT -bm25({FTS_TABLE}, 10.0, 1.0) FROM {FTS_TABLE} '
+            f'WHERE {FTS_TABLE} MATCH %s '
+            f'AND rowid = "recipes_recipe"."id")',
+            params,
+            output_field=FloatField()
+        )
+    else:
+        for term in terms:
+            queryset = queryset.filter(
+                Q(name__icontains=term) | Q(text__icontains=term)
+            )
+        return queryset
+    return queryset.filter(match).alias(search_rank=rank).order_by(
+        '-search_rank', *queryset.model._meta.ordering
+    )
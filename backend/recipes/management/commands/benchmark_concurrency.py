@@ -0,0 +1,99 @@
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = (
+        'Измеряет пропускную способность запущенных серверов при разном '
+        'числе одновременных соединений. Например, для сравнения '
+        'развёртывания через foodgram_project.wsgi и foodgram_project.asgi.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'servers',
+            nargs='+',
+            help='Адреса серверов, например http://localhost:8000.'
+        )
+        parser.add_argument(
+            '--path',
+            action='append',
+            dest='paths',
+            help='Путь запроса; можно указать несколько раз.'
+        )
+        parser.add_argument(
+            '--concurrency',
+            type=int,
+            nargs='+',
+            default=[1, 16, 64]
+        )
+        parser.add_argument(
+            '--duration',
+            type=float,
+            default=10,
+            help='Длительность одного замера, секунд.'
+        )
+        parser.add_argument('--timeout', type=float, default=30)
+
+    def handle(self, *args, **options):
+        paths = options['paths'] or [
+            '/api/recipes/',
+            '/api/recipes/?page=2',
+            '/api/ingredients/?name=а'
+        ]
+        for server in options['servers']:
+            for concurrency in options['concurrency']:
+                latencies, errors, elapsed = self.run(
+                    server.rstrip('/'),
+                    paths,
+                    concurrency,
+                    options['duration'],
+                    options['timeout']
+                )
+                self.report(server, concurrency, latencies, errors, elapsed)
+
+    def run(self, server, paths, concurrency, duration, timeout):
+        latencies = []
+        errors = []
+        lock = threading.Lock()
+        deadline = time.perf_counter() + duration
+
+        def worker(number):
+            session = requests.Session()
+            index = number
+            while time.perf_counter() < deadline:
+                url = server + paths[index % len(paths)]
+                index += 1
+                start = time.perf_counter()
+                try:
+                    response = session.get(url, timeout=timeout)
+                    failed = response.status_code >= 400
+                except requests.RequestException:
+                    failed = True
+                latency = (time.perf_counter() - start) * 1000
+                with lock:
+                    (errors if failed else latencies).append(latency)
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            list(executor.map(worker, range(concurrency)))
+        return latencies, errors, time.perf_counter() - start
+
+    def report(self, server, concurrency, latencies, errors, elapsed):
+        if len(latencies) > 1:
+            quantiles = statistics.quantiles(latencies, n=100)
+            latency = (
+                f'p50 {quantiles[49]:.1f} мс, p95 {quantiles[94]:.1f} мс'
+            )
+        else:
+            latency = 'нет успешных ответов'
+        self.stdout.write(
+            f'{server} соединений: {concurrency}: '
+            f'{len(latencies) / elapsed:.1f} запросов/с, {latency}, '
+            f'ошибок: {len(errors)}'
+        )
@@ -0,0 +1,91 @@
+import random
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.benchmarks import get_percentiles
+from recipes.search import CookableRecipesQuery, cookable_index
+
+
+class Command(BaseCommand):
+    help = (
+        'Замеряет поиск рецептов по имеющимся ингредиентам: построение '
+        'обратного индекса и время запросов к нему в сравнении '
+        'с группировкой по IngredientInRecipe в БД. Каталог заранее '
+        'заполняется командой seed_load_data, например на 100000 рецептов.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--ingredients', type=int, nargs='+', default=[5, 10, 20],
+            help='Число имеющихся ингредиентов в запросе.'
+        )
+        parser.add_argument('--queries', type=int, default=100)
+        parser.add_argument(
+            '--sql-queries', type=int, default=10,
+            help='Число запросов для замера через БД; 0 - пропустить.'
+        )
+        parser.add_argument('--limit', type=int, default=6)
+        parser.add_argument('--seed', type=int, default=1)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        start = time.perf_counter()
+        _, _, postings, recipe_ingredients = cookable_index.get_data()
+        build_time = time.perf_counter() - start
+        if not recipe_ingredients:
+            raise CommandError(
+                'В базе нет рецептов, выполните seed_load_data.'
+            )
+        self.stdout.write(
+            f'Индекс: рецептов {len(recipe_ingredients)}, ингредиентов '
+            f'{len(postings)}, построение {build_time:.2f} с.'
+        )
+        ingredient_ids = sorted(postings)
+        limit = options['limit']
+        for size in options['ingredients']:
+            queries = [
+                rng.sample(ingredient_ids, min(size, len(ingredient_ids)))
+                for _ in range(options['queries'])
+            ]
+            index_latencies = []
+            candidates = []
+            for query in queries:
+                start = time.perf_counter()
+                recipes = cookable_index.find(query)
+                recipes[0:limit]
+                index_latencies.append((time.perf_counter() - start) * 1000)
+                candidates.append(len(recipes))
+            line = (
+                f'ингредиентов {size}: кандидатов в среднем '
+                f'{sum(candidates) // len(candidates)}, индекс p50 '
+                f'{get_percentiles(index_latencies)["p50"]} мс, p95 '
+                f'{get_percentiles(index_latencies)["p95"]} мс'
+            )
+            sql_latencies = []
+            for query in queries[:options['sql_queries']]:
+                start = time.perf_counter()
+                expected = self.find_with_sql(query, limit)
+                sql_latencies.append((time.perf_counter() - start) * 1000)
+                found = [
+                    recipe_id for recipe_id, _, _
+                    in cookable_index.find(query)[0:limit]
+                ]
+                if found != expected:
+                    raise CommandError(
+                        f'Результаты индекса и БД отличаются: {found} != '
+                        f'{expected}.'
+                    )
+            if sql_latencies:
+                line += (
+                    f'; БД p50 {get_percentiles(sql_latencies)["p50"]} мс, '
+                    f'p95 {get_percentiles(sql_latencies)["p95"]} мс'
+                )
+            self.stdout.write(line)
+
+    def find_with_sql(self, ingredient_ids, limit):
+        """Та же выборка группировкой по ингредиентам рецептов в БД."""
+        return [
+            recipe_id for recipe_id, _, _
+            in CookableRecipesQuery(ingredient_ids)[0:limit]
+        ]
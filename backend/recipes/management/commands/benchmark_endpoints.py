@@ -0,0 +1,231 @@
+import statistics
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext, override_settings
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from core.benchmarks import (
+    get_change,
+    get_percentiles,
+    load_baseline,
+    save_baseline,
+)
+from recipes.management.commands.seed_load_data import (
+    PLACEHOLDER_IMAGE,
+    PLACEHOLDER_IMAGE_NAME,
+)
+from recipes.models import Ingredient, Recipe, Tag
+
+User = get_user_model()
+
+DEFAULT_BASELINE = Path(settings.BASE_DIR) / 'benchmark_baseline.json'
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        'Прогоняет сценарии запросов к API внутри процесса и выводит '
+        'перцентили времени ответа и число SQL-запросов. Результаты '
+        'сравниваются с сохранённым базовым замером. Изменяющие запросы '
+        'выполняются в откатываемых транзакциях.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=30)
+        parser.add_argument('--warmup', type=int, default=3)
+        parser.add_argument(
+            '--prefix', default='load',
+            help='Префикс пользователей, созданных seed_load_data.'
+        )
+        parser.add_argument(
+            '--scenario', action='append', dest='scenarios',
+            help='Запустить только указанные сценарии.'
+        )
+        parser.add_argument('--baseline', default=str(DEFAULT_BASELINE))
+        parser.add_argument(
+            '--save-baseline', action='store_true',
+            help='Сохранить результаты как новый базовый замер.'
+        )
+        parser.add_argument(
+            '--max-regression', type=float, default=20,
+            help='Допустимый рост p95 относительно базового замера, %%.'
+        )
+
+    def handle(self, *args, **options):
+        user = User.objects.filter(
+            username__startswith=f'{options["prefix"]}_',
+            subscriptions__isnull=False
+        ).order_by('id').first()
+        if user is None:
+            raise CommandError(
+                'Нет данных для замеров, сначала выполните seed_load_data.'
+            )
+        token, _ = Token.objects.get_or_create(user=user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+        self.anonymous_client = APIClient()
+        self.user = user
+
+        scenarios = self.get_scenarios()
+        if options['scenarios']:
+            unknown = set(options['scenarios']) - scenarios.keys()
+            if unknown:
+                raise CommandError(
+                    f'Неизвестные сценарии: {", ".join(sorted(unknown))}.'
+                )
+            scenarios = {
+                name: scenarios[name] for name in options['scenarios']
+            }
+        hosts = [*settings.ALLOWED_HOSTS, 'testserver']
+        with override_settings(ALLOWED_HOSTS=hosts):
+            results = {
+                name: self.measure(request, options)
+                for name, request in scenarios.items()
+            }
+        self.report(results, options)
+
+    def get_scenarios(self):
+        tags = list(Tag.objects.values_list('slug', flat=True)[:2])
+        tag_query = '&'.join(f'tags={slug}' for slug in tags)
+        ingredient = Ingredient.objects.order_by('id').first()
+        prefix = ingredient.name[:2] if ingredient else 'а'
+        recipe = self.user.author_recipes.order_by('id').first()
+        ingredient_ids = list(
+            Ingredient.objects.order_by('id').values_list('id', flat=True)[:8]
+        )
+        recipe_data = {
+            'name': 'Замер',
+            'text': 'Рецепт для замера.',
+            'cooking_time': 10,
+            'tags': list(Tag.objects.values_list('id', flat=True)[:2]),
+            'ingredients': [
+                {'id': ingredient_id, 'amount': 10}
+                for ingredient_id in ingredient_ids
+            ]
+        }
+        client = self.client
+        scenarios = {
+            'recipes_anonymous': lambda: self.anonymous_client.get(
+                '/api/recipes/'
+            ),
+            'recipes': lambda: client.get('/api/recipes/'),
+            'recipes_page_10': lambda: client.get('/api/recipes/?page=10'),
+            'recipes_tags': lambda: client.get(f'/api/recipes/?{tag_query}'),
+            'recipes_favorited': lambda: client.get(
+                '/api/recipes/?is_favorited=1'
+            ),
+            'recipes_author': lambda: client.get(
+                f'/api/recipes/?author={self.user.id}'
+            ),
+            'subscriptions': lambda: client.get(
+                '/api/users/subscriptions/?recipes_limit=3'
+            ),
+            'ingredient_search': lambda: client.get(
+                f'/api/ingredients/?name={prefix}'
+            ),
+            'download_shopping_cart': lambda: client.get(
+                '/api/recipes/download_shopping_cart/'
+            ),
+            'recipe_create': lambda: self.rollback(lambda: client.post(
+                '/api/recipes/',
+                dict(
+                    recipe_data,
+                    image=f'data:image/png;base64,{PLACEHOLDER_IMAGE}'
+                ),
+                format='json'
+            )),
+        }
+        if recipe is not None:
+            scenarios['recipe_update'] = lambda: self.rollback(
+                lambda: client.patch(
+                    f'/api/recipes/{recipe.id}/', recipe_data, format='json'
+                )
+            )
+        return scenarios
+
+    def rollback(self, request):
+        """Выполняет изменяющий запрос и откатывает его транзакцию."""
+        image_name = None
+        try:
+            with transaction.atomic():
+                response = request()
+                if response.status_code == 201:
+                    image_name = Recipe.objects.values_list(
+                        'image', flat=True
+                    ).get(id=response.data['id'])
+                raise Rollback
+        except Rollback:
+            pass
+        if image_name and image_name != PLACEHOLDER_IMAGE_NAME:
+            default_storage.delete(image_name)
+        return response
+
+    def measure(self, request, options):
+        for _ in range(options['warmup']):
+            self.consume(request())
+        latencies = []
+        queries = []
+        for _ in range(options['repeat']):
+            with CaptureQueriesContext(connection) as context:
+                start = time.perf_counter()
+                response = request()
+                self.consume(response)
+                latencies.append((time.perf_counter() - start) * 1000)
+            if response.status_code >= 400:
+                raise CommandError(
+                    f'Ответ {response.status_code}: {response.content[:200]}'
+                )
+            queries.append(len(context.captured_queries))
+        return dict(
+            get_percentiles(latencies), queries=statistics.median(queries)
+        )
+
+    def consume(self, response):
+        if response.streaming:
+            b''.join(response.streaming_content)
+
+    def report(self, results, options):
+        baseline = load_baseline(options['baseline'])
+        regressions = []
+        self.stdout.write(
+            f'{"сценарий":<24}{"p50, мс":>10}{"p95, мс":>10}'
+            f'{"p99, мс":>10}{"запросов":>10}  к базовому'
+        )
+        for name, result in results.items():
+            line = (
+                f'{name:<24}{result["p50"]:>10}{result["p95"]:>10}'
+                f'{result["p99"]:>10}{result["queries"]:>10}'
+            )
+            base = baseline.get(name)
+            if base:
+                change = get_change(result['p95'], base['p95'])
+                line += f'  p95 {change:+.0f}%'
+                if result['queries'] != base['queries']:
+                    line += f', запросов {base["queries"]} → '
+                    line += f'{result["queries"]}'
+                if (
+                    change > options['max_regression']
+                    or result['queries'] > base['queries']
+                ):
+                    regressions.append(name)
+            self.stdout.write(line)
+        if options['save_baseline']:
+            save_baseline(options['baseline'], results)
+            self.stdout.write(
+                f'Базовый замер сохранён в {options["baseline"]}.'
+            )
+        elif regressions:
+            raise CommandError(
+                f'Ухудшение относительно базового замера: '
+                f'{", ".join(regressions)}.'
+            )
@@ -0,0 +1,94 @@
+import io
+import statistics
+import time
+
+from django.contrib.auth.models import AnonymousUser
+from django.core.management.base import BaseCommand, CommandError
+from django.test import override_settings
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from api.parsers import FastJSONParser
+from api.renderers import FastJSONRenderer, orjson
+from api.serializers import IngredientSerializer, RecipeSerializer
+from api.views import get_recipe_read_queryset
+from recipes.models import Ingredient
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает скорость JSONRenderer и JSONParser из DRF с '
+        'FastJSONRenderer и FastJSONParser на данных RecipeSerializer '
+        'и полного списка ингредиентов из текущей базы.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--recipes', type=int, default=100,
+            help='Рецептов в сериализуемой странице.'
+        )
+        parser.add_argument('--repeat', type=int, default=50)
+
+    def handle(self, *args, **options):
+        if orjson is None:
+            self.stdout.write(self.style.WARNING(
+                'orjson не установлен, FastJSONRenderer использует '
+                'стандартный модуль json.'
+            ))
+        with override_settings(ALLOWED_HOSTS=['testserver']):
+            request = Request(APIRequestFactory().get('/api/recipes/'))
+            request.user = AnonymousUser()
+            recipes = RecipeSerializer(
+                get_recipe_read_queryset(request.user)[:options['recipes']],
+                many=True,
+                context={'request': request}
+            ).data
+        if not recipes:
+            raise CommandError(
+                'В базе нет рецептов, выполните seed_load_data.'
+            )
+        datasets = {
+            f'recipes ({len(recipes)})': recipes,
+            f'ingredients ({Ingredient.objects.count()})': (
+                IngredientSerializer(Ingredient.objects.all(), many=True).data
+            ),
+        }
+        self.stdout.write(
+            f'{"данные":<22}{"операция":<10}{"DRF, мс":>10}'
+            f'{"fast, мс":>10}{"ускорение":>11}'
+        )
+        for name, data in datasets.items():
+            content = JSONRenderer().render(data)
+            if FastJSONRenderer().render(data) != content:
+                raise CommandError(f'{name}: вывод рендереров отличается.')
+            self.compare(
+                name,
+                'render',
+                lambda renderer: renderer().render(data),
+                (JSONRenderer, FastJSONRenderer),
+                options['repeat']
+            )
+            self.compare(
+                name,
+                'parse',
+                lambda parser: parser().parse(io.BytesIO(content)),
+                (JSONParser, FastJSONParser),
+                options['repeat']
+            )
+
+    def compare(self, name, operation, run, classes, repeat):
+        medians = []
+        for cls in classes:
+            timings = []
+            for _ in range(repeat):
+                start = time.perf_counter()
+                run(cls)
+                timings.append((time.perf_counter() - start) * 1000)
+            medians.append(statistics.median(timings))
+        base, fast = medians
+        self.stdout.write(
+            f'{name:<22}{operation:<10}{base:>10.2f}{fast:>10.2f}'
+            f'{base / fast:>10.1f}x'
+        )
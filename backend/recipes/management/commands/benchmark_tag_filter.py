@@ -0,0 +1,118 @@
+import random
+import statistics
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import F, Q
+
+from recipes.models import Recipe, Tag
+
+User = get_user_model()
+
+PAGE_SIZE = 6
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает фильтрацию рецептов по тегам через соединение '
+        'с DISTINCT и через битовую маску. Тестовые данные создаются '
+        'в транзакции, которая откатывается по завершении.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--recipes', type=int, default=50000)
+        parser.add_argument('--tags', type=int, default=8)
+        parser.add_argument('--repeat', type=int, default=20)
+        parser.add_argument('--seed', type=int, default=1)
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                self.run(options)
+                raise Rollback
+        except Rollback:
+            pass
+
+    def run(self, options):
+        rng = random.Random(options['seed'])
+        author = User.objects.create(
+            username='benchmark_tag_filter',
+            email='benchmark_tag_filter@example.com'
+        )
+        tags = []
+        for index in range(options['tags']):
+            tag = Tag(name=f'benchmark-{index}', slug=f'benchmark-{index}')
+            tag.save()
+            tags.append(tag)
+        recipes = []
+        recipe_tags = []
+        for index in range(options['recipes']):
+            chosen = rng.sample(tags, rng.randint(1, 3))
+            recipes.append(Recipe(
+                author=author,
+                name=f'Рецепт {index}',
+                text='Описание',
+                cooking_time=10,
+                tags_mask=Tag.get_mask(tag.bit for tag in chosen)
+            ))
+            recipe_tags.append(chosen)
+        recipes = Recipe.objects.bulk_create(recipes, batch_size=1000)
+        Recipe.tags.through.objects.bulk_create(
+            [
+                Recipe.tags.through(recipe_id=recipe.id, tag_id=tag.id)
+                for recipe, chosen in zip(recipes, recipe_tags)
+                for tag in chosen
+            ],
+            batch_size=1000
+        )
+        self.stdout.write(
+            f'Создано рецептов: {len(recipes)}, тегов: {len(tags)}.'
+        )
+        queries = [
+            [tag.slug for tag in rng.sample(tags, rng.randint(1, 3))]
+            for _ in range(options['repeat'])
+        ]
+        for mode in ('any', 'all'):
+            join_times = self.measure(self.filter_by_join, queries, mode)
+            mask_times = self.measure(self.filter_by_mask, queries, mode)
+            self.stdout.write(
+                f'tags_mode={mode}: соединение + DISTINCT '
+                f'{statistics.median(join_times):.2f} мс, '
+                f'битовая маска {statistics.median(mask_times):.2f} мс '
+                '(медиана на страницу с подсчётом количества)'
+            )
+
+    def measure(self, filter_method, queries, mode):
+        times = []
+        for slugs in queries:
+            start = time.perf_counter()
+            queryset = filter_method(Recipe.objects.all(), slugs, mode)
+            queryset.count()
+            list(queryset[:PAGE_SIZE])
+            times.append((time.perf_counter() - start) * 1000)
+        return times
+
+    def filter_by_join(self, queryset, slugs, mode):
+        if mode == 'all':
+            for slug in slugs:
+                queryset = queryset.filter(tags__slug=slug)
+            return queryset.distinct()
+        query = Q()
+        for slug in slugs:
+            query |= Q(tags__slug=slug)
+        return queryset.filter(query).distinct()
+
+    def filter_by_mask(self, queryset, slugs, mode):
+        mask = Tag.get_mask(
+            Tag.objects.filter(slug__in=slugs).values_list('bit', flat=True)
+        )
+        queryset = queryset.alias(tags_match=F('tags_mask').bitand(mask))
+        if mode == 'all':
+            return queryset.filter(tags_match=mask)
+        return queryset.filter(tags_match__gt=0)
@@ -0,0 +1,62 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+
+from core.images import generate_variants, mark_variants_ready
+from recipes.models import Recipe
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = (
+        'Создаёт уменьшенные копии изображений рецептов и аватаров, '
+        'загруженных до появления копий.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help='Пересоздать уже существующие копии.'
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=max(settings.IMAGE_VARIANTS_WORKERS, 1)
+        )
+
+    def handle(self, *args, **options):
+        images = [
+            (Recipe, pk, 'image', name)
+            for pk, name in Recipe.objects.exclude(
+                image=''
+            ).values_list('pk', 'image')
+        ] + [
+            (User, pk, 'avatar', name)
+            for pk, name in User.objects.exclude(avatar='').exclude(
+                avatar__isnull=True
+            ).values_list('pk', 'avatar')
+        ]
+        created = 0
+        failed = 0
+        with ThreadPoolExecutor(max_workers=options['workers']) as executor:
+            futures = [
+                (image, executor.submit(generate_variants, image[3],
+                                        options['force']))
+                for image in images
+            ]
+            for image, future in futures:
+                try:
+                    created += future.result()
+                except Exception as error:
+                    failed += 1
+                    self.stderr.write(f'{image[3]}: {error}')
+                else:
+                    mark_variants_ready(*image)
+        self.stdout.write(self.style.SUCCESS(
+            f'Изображений: {len(images)}, создано копий: {created}, '
+            f'ошибок: {failed}.'
+        ))
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from recipes import fulltext
+
+
+class Command(BaseCommand):
+    help = (
+        'Создаёт заново полнотекстовый индекс рецептов и его триггеры, '
+        'например после пересоздания таблицы рецептов в SQLite, '
+        'и заполняет его по текущим рецептам.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS)
+
+    def handle(self, *args, **options):
+        with connections[options['database']].schema_editor() as editor:
+            fulltext.install(editor)
+        self.stdout.write(self.style.SUCCESS(
+            'Полнотекстовый индекс рецептов создан.'
+        ))
@@ -0,0 +1,206 @@
+import csv
+import io
+import json
+import time
+from itertools import islice
+from pathlib import Path
+
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from django.db import IntegrityError, connection, transaction
+
+from recipes.models import Ingredient, Tag
+from recipes.versions import reference_data_version
+
+JSON_CHUNK_SIZE = 64 * 1024
+INGREDIENT_FIELDS = ('name', 'measurement_unit')
+TAG_FIELDS = ('name', 'slug')
+
+
+def read_csv(file, fields):
+    for row in csv.reader(file):
+        if len(row) >= len(fields):
+            yield tuple(row[:len(fields)])
+
+
+def read_json(file, fields):
+    """
+    Потоково читает JSON-массив объектов или JSON Lines.
+
+    Поддерживаются объекты с полями fields и фикстуры Django
+    с данными в ключе fields.
+    """
+    decoder = json.JSONDecoder()
+    buffer = ''
+    position = 0
+    eof = False
+    while True:
+        while position < len(buffer) and buffer[position] in ' \t\r\n[,]':
+            position += 1
+        if position == len(buffer):
+            if eof:
+                return
+            buffer = file.read(JSON_CHUNK_SIZE)
+            position = 0
+            eof = not buffer
+            continue
+        try:
+            item, end = decoder.raw_decode(buffer, position)
+        except json.JSONDecodeError:
+            chunk = file.read(JSON_CHUNK_SIZE)
+            if not chunk:
+                raise CommandError(f'Некорректный JSON в позиции {position}.')
+            buffer = buffer[position:] + chunk
+            position = 0
+            continue
+        position = end
+        item = item.get('fields', item)
+        yield tuple(item[field] for field in fields)
+
+
+class Command(BaseCommand):
+    help = (
+        'Загружает ингредиенты из CSV или JSON пакетами, пропуская '
+        'уже существующие. В PostgreSQL каждый пакет копируется через '
+        'COPY во временную таблицу и сразу переносится в ингредиенты. '
+        'С --tags также загружает теги (название, слаг), обновляя '
+        'названия существующих.'
+    )
+
+    readers = {'.csv': read_csv, '.json': read_json, '.jsonl': read_json}
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'path', nargs='?', help='Путь к файлу ингредиентов CSV или JSON.'
+        )
+        parser.add_argument(
+            '--tags', help='Путь к файлу тегов CSV или JSON.'
+        )
+        parser.add_argument('--batch-size', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        if not options['path'] and not options['tags']:
+            raise CommandError('Укажите файл ингредиентов или --tags.')
+        if options['path']:
+            self.load_ingredients(
+                Path(options['path']), options['batch_size']
+            )
+        if options['tags']:
+            self.load_tags(Path(options['tags']))
+
+    def get_reader(self, path):
+        reader = self.readers.get(path.suffix.lower())
+        if reader is None:
+            raise CommandError('Поддерживаются только файлы CSV и JSON.')
+        if not path.exists():
+            raise CommandError(f'Файл {path} не найден.')
+        return reader
+
+    def load_tags(self, path):
+        """
+        Загружает теги по одному через save().
+
+        save() назначает новому тегу бит маски, а тегов не больше
+        MAX_TAGS_COUNT, поэтому пакетная вставка здесь не нужна.
+        """
+        reader = self.get_reader(path)
+        created = updated = 0
+        try:
+            with path.open(encoding='utf-8') as file, transaction.atomic():
+                for name, slug in reader(file, TAG_FIELDS):
+                    name, slug = name.strip(), slug.strip()
+                    if not name or not slug:
+                        continue
+                    tag = Tag.objects.filter(slug=slug).first()
+                    if tag is None:
+                        Tag.objects.create(name=name, slug=slug)
+                        created += 1
+                    elif tag.name != name:
+                        tag.name = name
+                        tag.save(update_fields=['name'])
+                        updated += 1
+        except (ValidationError, IntegrityError) as error:
+            raise CommandError(f'Не удалось загрузить теги: {error}')
+        self.stdout.write(self.style.SUCCESS(
+            f'Добавлено тегов: {created}, обновлено: {updated}.'
+        ))
+
+    def load_ingredients(self, path, batch_size):
+        reader = self.get_reader(path)
+        if connection.vendor == 'postgresql':
+            load_batch = self.copy_batch
+        else:
+            load_batch = self.insert_batch
+
+        start = time.perf_counter()
+        count_before = Ingredient.objects.count()
+        read = 0
+        with path.open(encoding='utf-8') as file, transaction.atomic():
+            if connection.vendor == 'postgresql':
+                self.create_staging_table()
+            rows = reader(file, INGREDIENT_FIELDS)
+            while batch := list(islice(rows, batch_size)):
+                read += len(batch)
+                unique_rows = list(dict.fromkeys(
+                    (name.strip(), measurement_unit.strip())
+                    for name, measurement_unit in batch
+                    if name.strip() and measurement_unit.strip()
+                ))
+                load_batch(unique_rows)
+                self.report_progress(read, start)
+            reference_data_version.bump()
+
+        created = Ingredient.objects.count() - count_before
+        elapsed = time.perf_counter() - start
+        self.stdout.write(self.style.SUCCESS(
+            f'Прочитано строк: {read}, добавлено ингредиентов: {created} '
+            f'за {elapsed:.2f} с ({read / elapsed:.0f} строк/с).'
+        ))
+
+    def report_progress(self, read, start):
+        elapsed = time.perf_counter() - start
+        self.stdout.write(
+            f'Обработано строк: {read} ({read / elapsed:.0f} строк/с)'
+        )
+
+    def insert_batch(self, rows):
+        Ingredient.objects.bulk_create(
+            [
+                Ingredient(name=name, measurement_unit=measurement_unit)
+                for name, measurement_unit in rows
+            ],
+            ignore_conflicts=True
+        )
+
+    def create_staging_table(self):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'CREATE TEMPORARY TABLE ingredient_staging '
+                '(name text, measurement_unit text) ON COMMIT DROP'
+            )
+
+    def copy_batch(self, rows):
+        """
+        Копирует пакет во временную таблицу и переносит его
+        в ингредиенты, поэтому таблица не растёт с размером файла.
+        """
+        data = io.StringIO()
+        csv.writer(data).writerows(rows)
+        data.seek(0)
+        sql = (
+            'COPY ingredient_staging (name, measurement_unit) '
+            'FROM STDIN WITH (FORMAT csv)'
+        )
+        with connection.cursor() as cursor:
+            if hasattr(cursor.cursor, 'copy_expert'):
+                cursor.cursor.copy_expert(sql, data)
+            else:
+                with cursor.cursor.copy(sql) as copy:
+                    copy.write(data.getvalue())
+            cursor.execute(
+                f'INSERT INTO {Ingredient._meta.db_table} '
+                '(name, measurement_unit) '
+                'SELECT name, measurement_unit FROM ingredient_staging '
+                'ON CONFLICT (name, measurement_unit) DO NOTHING'
+            )
+            cursor.execute('TRUNCATE ingredient_staging')
@@ -0,0 +1,348 @@
+import json
+import re
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import requests
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from core.benchmarks import (
+    get_change,
+    get_percentiles,
+    load_baseline,
+    save_baseline,
+)
+
+DEFAULT_COLLECTION = (
+    Path(settings.BASE_DIR).parent
+    / 'postman_collection'
+    / 'foodgram.postman_collection.json'
+)
+DEFAULT_BASELINE = Path(settings.BASE_DIR) / 'load_test_baseline.json'
+VARIABLE_PATTERN = re.compile(r'\{\{(\w+)\}\}')
+
+# Запросы коллекции, которые один раз выполняются перед замером,
+# и переменные, которые берутся из их ответов.
+SETUP = (
+    ('create_third_user', {'thirdUserId': 'id'}),
+    ('get_tag_list // No Auth', {
+        'firstTagId': '0.id',
+        'secondTagId': '1.id',
+        'secondTagSlug': '1.slug',
+    }),
+    ('get_ingredients_list // No Auth', {
+        'firstIndredientId': '0.id',
+        'secondIndredientId': '1.id',
+    }),
+)
+# Сценарий одного виртуального пользователя. Удаляющие запросы
+# в конце возвращают базу к исходному состоянию, кроме учётной записи.
+FLOW = (
+    ('create_first_user', {'userId': 'id'}),
+    ('get_token_for_first_user', {
+        'userToken': 'auth_token',
+        'secondUserToken': 'auth_token',
+    }),
+    ('create_fifth_recipe // User', {'firstRecipeId': 'id'}),
+    ('get_recipes_list // User', {}),
+    ('get_recipe_detail // User', {}),
+    ('add_to_favorite // User', {}),
+    ('add_to_shopping_cart // User', {}),
+    ('download_shopping_cart // User', {}),
+    ('create_subscription // User', {}),
+    ('get_subscription_list // User', {}),
+    ('delete_first_subscription // User', {}),
+    ('remove_from_shopping_cart // User', {}),
+    ('remove_from_favorite // User', {}),
+    ('delete_first_recipe // Second User', {}),
+)
+TOTAL = 'total'
+
+
+def load_collection(path):
+    """
+    Запросы Postman-коллекции по названию.
+
+    Авторизация, не заданная у запроса, наследуется от ближайшей
+    папки, как в Postman. Из запросов с одинаковым названием
+    берётся первый.
+    """
+    collection = json.loads(Path(path).read_text())
+    found = {}
+
+    def walk(items, auth):
+        for item in items:
+            if 'item' in item:
+                walk(item['item'], item.get('auth') or auth)
+                continue
+            request = item['request']
+            body = request.get('body') or {}
+            found.setdefault(item['name'], {
+                'method': request['method'],
+                'url': request['url']['raw'],
+                'body': body.get('raw'),
+                'auth': request.get('auth') or auth,
+            })
+
+    walk(collection['item'], collection.get('auth'))
+    variables = {
+        variable['key']: variable['value']
+        for variable in collection.get('variable', ())
+    }
+    return found, variables
+
+
+def substitute(text, variables):
+    return VARIABLE_PATTERN.sub(
+        lambda match: str(variables[match[1]]), text
+    )
+
+
+def extract(data, path):
+    """Значение из ответа по пути вида '0.id'."""
+    for key in path.split('.'):
+        data = data[int(key)] if isinstance(data, list) else data[key]
+    return data
+
+
+class Command(BaseCommand):
+    help = (
+        'Нагрузочный прогон запущенного бэкенда по сценариям '
+        'Postman-коллекции: регистрация, вход, создание рецепта, '
+        'избранное, список покупок и подписка. Выводит пропускную '
+        'способность и перцентили времени ответа по запросам и '
+        'сравнивает их с сохранённым базовым замером.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'server',
+            nargs='?',
+            help='Адрес сервера, по умолчанию baseUrl из коллекции.'
+        )
+        parser.add_argument(
+            '--users',
+            type=int,
+            nargs='+',
+            default=[10],
+            help='Число виртуальных пользователей; можно указать несколько.'
+        )
+        parser.add_argument(
+            '--iterations',
+            type=int,
+            default=5,
+            help='Повторов сценария на виртуального пользователя.'
+        )
+        parser.add_argument('--collection', default=str(DEFAULT_COLLECTION))
+        parser.add_argument('--timeout', type=float, default=30)
+        parser.add_argument('--baseline', default=str(DEFAULT_BASELINE))
+        parser.add_argument(
+            '--save-baseline', action='store_true',
+            help='Сохранить результаты как новый базовый замер.'
+        )
+        parser.add_argument(
+            '--max-regression', type=float, default=20,
+            help='Допустимое ухудшение p95 и пропускной способности, %%.'
+        )
+
+    def handle(self, *args, **options):
+        try:
+            self.requests, self.variables = load_collection(
+                options['collection']
+            )
+        except (OSError, ValueError, KeyError) as error:
+            raise CommandError(f'Не удалось прочитать коллекцию: {error}')
+        missing = [
+            name for name, _ in SETUP + FLOW if name not in self.requests
+        ]
+        if missing:
+            raise CommandError(
+                f'В коллекции нет запросов: {", ".join(missing)}.'
+            )
+        if options['server']:
+            self.variables['baseUrl'] = options['server'].rstrip('/')
+        self.timeout = options['timeout']
+        self.run_id = int(time.time())
+        self.setup()
+
+        baseline = load_baseline(options['baseline'])
+        results = {}
+        regressions = []
+        for users in options['users']:
+            result = self.run(users, options['iterations'])
+            results[str(users)] = result
+            regressions += self.report(
+                users, result, baseline.get(str(users)), options
+            )
+        if options['save_baseline']:
+            save_baseline(options['baseline'], results)
+            self.stdout.write(
+                f'Базовый замер сохранён в {options["baseline"]}.'
+            )
+        elif regressions:
+            raise CommandError(
+                f'Ухудшение относительно базового замера: '
+                f'{", ".join(regressions)}.'
+            )
+
+    def get_user_variables(self, name):
+        return {
+            'email': json.dumps(f'{name}@example.com'),
+            'username': json.dumps(name),
+        }
+
+    def setup(self):
+        session = requests.Session()
+        self.variables.update({
+            'thirdUserEmail': json.dumps(
+                f'loadtest-{self.run_id}-author@example.com'
+            ),
+            'thirdUserUsername': json.dumps(f'loadtest-{self.run_id}-author'),
+        })
+        for name, extractors in SETUP:
+            try:
+                response = self.send(session, name, self.variables)
+            except requests.RequestException as error:
+                raise CommandError(f'{name}: {error}')
+            if response.status_code >= 400:
+                raise CommandError(
+                    f'{name}: ответ {response.status_code} '
+                    f'{response.text[:200]}'
+                )
+            try:
+                self.extract(response, extractors, self.variables)
+            except (LookupError, ValueError):
+                raise CommandError(
+                    f'{name}: в ответе нет нужных данных. Создайте как '
+                    'минимум 2 ингредиента и 2 тега.'
+                )
+
+    def send(self, session, name, variables):
+        request = self.requests[name]
+        headers = {}
+        auth = request['auth'] or {}
+        if auth.get('type') == 'apikey':
+            apikey = {item['key']: item['value'] for item in auth['apikey']}
+            headers[apikey['key']] = substitute(apikey['value'], variables)
+        body = request['body']
+        if body:
+            headers['Content-Type'] = 'application/json'
+            body = substitute(body, variables).encode()
+        return session.request(
+            request['method'],
+            substitute(request['url'], variables),
+            data=body,
+            headers=headers,
+            timeout=self.timeout
+        )
+
+    def extract(self, response, extractors, variables):
+        if extractors:
+            data = response.json()
+            for variable, path in extractors.items():
+                variables[variable] = extract(data, path)
+
+    def run(self, users, iterations):
+        latencies = defaultdict(list)
+        errors = defaultdict(int)
+        flows = []
+        lock = threading.Lock()
+
+        def worker(number):
+            session = requests.Session()
+            for iteration in range(iterations):
+                variables = dict(
+                    self.variables,
+                    **self.get_user_variables(
+                        f'loadtest-{self.run_id}-{users}-{number}-{iteration}'
+                    )
+                )
+                completed = True
+                for name, extractors in FLOW:
+                    start = time.perf_counter()
+                    try:
+                        response = self.send(session, name, variables)
+                        failed = response.status_code >= 400
+                        if not failed:
+                            self.extract(response, extractors, variables)
+                    except (requests.RequestException, LookupError,
+                            ValueError):
+                        failed = True
+                    latency = (time.perf_counter() - start) * 1000
+                    with lock:
+                        if failed:
+                            errors[name] += 1
+                        else:
+                            latencies[name].append(latency)
+                    if failed:
+                        completed = False
+                        break
+                if completed:
+                    with lock:
+                        flows.append(number)
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=users) as executor:
+            list(executor.map(worker, range(users)))
+        elapsed = time.perf_counter() - start
+
+        result = {
+            name: dict(
+                get_percentiles(latencies[name]),
+                count=len(latencies[name]),
+                errors=errors[name]
+            )
+            for name, _ in FLOW
+        }
+        all_latencies = [
+            latency for values in latencies.values() for latency in values
+        ]
+        result[TOTAL] = dict(
+            get_percentiles(all_latencies),
+            count=len(all_latencies),
+            errors=sum(errors.values()),
+            rps=round(len(all_latencies) / elapsed, 2),
+            flows=len(flows),
+            flows_per_second=round(len(flows) / elapsed, 2)
+        )
+        return result
+
+    def report(self, users, result, baseline, options):
+        total = result[TOTAL]
+        self.stdout.write(
+            f'Виртуальных пользователей: {users}, сценариев пройдено: '
+            f'{total["flows"]} ({total["flows_per_second"]} в секунду), '
+            f'запросов в секунду: {total["rps"]}'
+        )
+        self.stdout.write(
+            f'{"запрос":<38}{"p50, мс":>10}{"p95, мс":>10}{"p99, мс":>10}'
+            f'{"ошибок":>8}  к базовому'
+        )
+        regressions = []
+        for name, stats in result.items():
+            line = (
+                f'{name:<38}{stats["p50"]:>10}{stats["p95"]:>10}'
+                f'{stats["p99"]:>10}{stats["errors"]:>8}'
+            )
+            if stats['errors']:
+                regressions.append(f'{name} ({users})')
+            base = (baseline or {}).get(name)
+            if base:
+                change = get_change(stats['p95'], base['p95'])
+                line += f'  p95 {change:+.0f}%'
+                if change > options['max_regression']:
+                    regressions.append(f'{name} ({users})')
+            self.stdout.write(line)
+        base = (baseline or {}).get(TOTAL)
+        if base:
+            change = get_change(total['rps'], base['rps'])
+            self.stdout.write(
+                f'Пропускная способность к базовому: {change:+.0f}%'
+            )
+            if change < -options['max_regression']:
+                regressions.append(f'rps ({users})')
+        return list(dict.fromkeys(regressions))
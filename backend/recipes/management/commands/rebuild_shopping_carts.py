@@ -0,0 +1,65 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from recipes.models import ShoppingCartIngredient
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересобирает суммы ингредиентов в списках покупок '
+        'или проверяет их соответствие рецептам.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--verify',
+            action='store_true',
+            help='Только проверить суммы, ничего не изменяя.'
+        )
+
+    def handle(self, *args, **options):
+        if options['verify']:
+            return self.verify()
+        with transaction.atomic():
+            ShoppingCartIngredient.objects.all().delete()
+            created = ShoppingCartIngredient.objects.bulk_create(
+                ShoppingCartIngredient(
+                    user_id=user_id,
+                    ingredient_id=ingredient_id,
+                    amount=amount
+                )
+                for (user_id, ingredient_id), amount
+                in ShoppingCartIngredient.objects.get_totals().items()
+            )
+        self.stdout.write(self.style.SUCCESS(
+            f'Списки покупок пересобраны, строк: {len(created)}.'
+        ))
+
+    def verify(self):
+        expected = ShoppingCartIngredient.objects.get_totals()
+        actual = {
+            (user_id, ingredient_id): amount
+            for user_id, ingredient_id, amount
+            in ShoppingCartIngredient.objects.values_list(
+                'user', 'ingredient', 'amount'
+            )
+        }
+        mismatches = [
+            (key, actual.get(key), expected.get(key))
+            for key in expected.keys() | actual.keys()
+            if actual.get(key) != expected.get(key)
+        ]
+        for (user_id, ingredient_id), current, correct in sorted(
+            mismatches, key=lambda item: item[0]
+        ):
+            self.stdout.write(
+                f'Пользователь {user_id}, ингредиент {ingredient_id}: '
+                f'{current} вместо {correct}'
+            )
+        if mismatches:
+            raise CommandError(
+                f'Расхождений в списках покупок: {len(mismatches)}.'
+            )
+        self.stdout.write(self.style.SUCCESS(
+            'Списки покупок соответствуют рецептам.'
+        ))
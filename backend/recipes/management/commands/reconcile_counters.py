@@ -0,0 +1,65 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from recipes.models import Favorite, Recipe
+from users.models import Subscription
+
+User = get_user_model()
+
+COUNTERS = (
+    (Recipe, 'favorites_count', Favorite, 'recipe'),
+    (User, 'recipes_count', Recipe, 'author'),
+    (User, 'subscribers_count', Subscription, 'subscription'),
+)
+
+
+def count_subquery(model, field):
+    """Подзапрос с количеством строк model, ссылающихся на объект."""
+    return Coalesce(
+        Subquery(
+            model.objects.filter(**{field: OuterRef('pk')}).order_by().values(
+                field
+            ).annotate(count=Count('pk')).values('count')
+        ),
+        0
+    )
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересчитывает денормализованные счётчики избранного, рецептов '
+        'и подписчиков или проверяет их корректность.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--verify',
+            action='store_true',
+            help='Только проверить счётчики, ничего не изменяя.'
+        )
+
+    def handle(self, *args, **options):
+        total = 0
+        for model, counter, related_model, field in COUNTERS:
+            with transaction.atomic():
+                wrong_count = model.objects.annotate(
+                    actual_count=count_subquery(related_model, field)
+                ).exclude(**{counter: F('actual_count')}).count()
+                if wrong_count and not options['verify']:
+                    model.objects.update(
+                        **{counter: count_subquery(related_model, field)}
+                    )
+            total += wrong_count
+            self.stdout.write(
+                f'{model._meta.verbose_name_plural}, {counter}: '
+                f'неверных значений {wrong_count}'
+            )
+        if options['verify'] and total:
+            raise CommandError(f'Неверных значений счётчиков: {total}.')
+        self.stdout.write(self.style.SUCCESS(
+            'Счётчики пересчитаны.' if not options['verify']
+            else 'Счётчики корректны.'
+        ))
@@ -0,0 +1,221 @@
+import base64
+import random
+import time
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from core.short_codes import encode_short_code
+from recipes.models import (
+    Favorite,
+    Ingredient,
+    IngredientInRecipe,
+    Recipe,
+    ShoppingList,
+    Tag,
+)
+from recipes.search import cookable_index
+from recipes.versions import recipe_data_version, reference_data_version
+from users.models import Subscription
+
+User = get_user_model()
+
+LOAD_PASSWORD = 'load-password'
+PLACEHOLDER_IMAGE_NAME = 'recipes/images/load_placeholder.png'
+PLACEHOLDER_IMAGE = (
+    'iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAYAAAAfFcSJAAAADUlEQVR42mP8z8BQDwAEhQ'
+    'GAhKmMIQAAAABJRU5ErkJggg=='
+)
+MIN_TAGS = 8
+MIN_INGREDIENTS = 500
+
+
+class Command(BaseCommand):
+    help = (
+        'Детерминированно создаёт нагрузочный набор данных: пользователей, '
+        'рецепты с тегами и ингредиентами, избранное, списки покупок '
+        'и подписки. Пароль всех пользователей - load-password.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--recipes', type=int, default=10000)
+        parser.add_argument(
+            '--ingredients-per-recipe', type=int, default=8,
+            help='Максимальное число ингредиентов в рецепте.'
+        )
+        parser.add_argument(
+            '--favorites', type=int, default=20,
+            help='Избранных рецептов на пользователя.'
+        )
+        parser.add_argument(
+            '--cart', type=int, default=5,
+            help='Рецептов в списке покупок на пользователя.'
+        )
+        parser.add_argument(
+            '--subscriptions', type=int, default=10,
+            help='Подписок на пользователя.'
+        )
+        parser.add_argument('--seed', type=int, default=1)
+        parser.add_argument(
+            '--prefix', default='load',
+            help='Префикс имён создаваемых пользователей.'
+        )
+        parser.add_argument('--batch-size', type=int, default=2000)
+        parser.add_argument(
+            '--clear', action='store_true',
+            help='Удалить пользователей с тем же префиксом и их данные.'
+        )
+
+    def handle(self, *args, **options):
+        self.rng = random.Random(options['seed'])
+        self.batch_size = options['batch_size']
+        prefix = options['prefix']
+        start = time.perf_counter()
+        if options['clear']:
+            deleted, _ = User.objects.filter(
+                username__startswith=f'{prefix}_'
+            ).delete()
+            self.stdout.write(f'Удалено объектов: {deleted}.')
+        with transaction.atomic():
+            tags = self.get_tags()
+            ingredient_ids = self.get_ingredient_ids()
+            users = self.create_users(prefix, options['users'])
+            recipes = self.create_recipes(
+                users, tags, ingredient_ids, options
+            )
+            self.create_relations(users, recipes, options)
+            call_command('reconcile_counters', stdout=self.stdout)
+            call_command('rebuild_shopping_carts', stdout=self.stdout)
+            recipe_data_version.bump()
+            reference_data_version.bump()
+            cookable_index.invalidate()
+        self.stdout.write(self.style.SUCCESS(
+            f'Создано пользователей: {len(users)}, рецептов: '
+            f'{len(recipes)} за {time.perf_counter() - start:.1f} с.'
+        ))
+
+    def bulk_create(self, model, objects, **kwargs):
+        return model.objects.bulk_create(
+            objects, batch_size=self.batch_size, **kwargs
+        )
+
+    def get_tags(self):
+        tags = list(Tag.objects.order_by('id'))
+        for index in range(len(tags), MIN_TAGS):
+            tag = Tag(name=f'Нагрузка {index}', slug=f'load-{index}')
+            tag.save()
+            tags.append(tag)
+        return tags
+
+    def get_ingredient_ids(self):
+        count = Ingredient.objects.count()
+        if count < MIN_INGREDIENTS:
+            self.bulk_create(
+                Ingredient,
+                [
+                    Ingredient(
+                        name=f'Нагрузочный ингредиент {index}',
+                        measurement_unit='г'
+                    )
+                    for index in range(count, MIN_INGREDIENTS)
+                ],
+                ignore_conflicts=True
+            )
+        return list(
+            Ingredient.objects.order_by('id').values_list('id', flat=True)
+        )
+
+    def create_users(self, prefix, count):
+        password = make_password(LOAD_PASSWORD)
+        return self.bulk_create(User, [
+            User(
+                username=f'{prefix}_{index}',
+                email=f'{prefix}_{index}@example.com',
+                first_name='Нагрузка',
+                last_name=str(index),
+                password=password
+            )
+            for index in range(count)
+        ])
+
+    def get_image_name(self):
+        if not default_storage.exists(PLACEHOLDER_IMAGE_NAME):
+            default_storage.save(
+                PLACEHOLDER_IMAGE_NAME,
+                ContentFile(base64.b64decode(PLACEHOLDER_IMAGE))
+            )
+        return PLACEHOLDER_IMAGE_NAME
+
+    def create_recipes(self, users, tags, ingredient_ids, options):
+        rng = self.rng
+        image = self.get_image_name()
+        recipe_tags = []
+        recipes = []
+        for index in range(options['recipes']):
+            chosen_tags = rng.sample(tags, rng.randint(1, 3))
+            recipe_tags.append(chosen_tags)
+            recipes.append(Recipe(
+                author=rng.choice(users),
+                name=f'Нагрузочный рецепт {index}',
+                text='Описание рецепта для нагрузочного тестирования.',
+                image=image,
+                cooking_time=rng.randint(1, 180),
+                tags_mask=Tag.get_mask(tag.bit for tag in chosen_tags)
+            ))
+        recipes = self.bulk_create(Recipe, recipes)
+        for recipe in recipes:
+            recipe.short_hash = encode_short_code(recipe.id)
+        Recipe.objects.bulk_update(
+            recipes, ('short_hash',), batch_size=self.batch_size
+        )
+        self.bulk_create(Recipe.tags.through, [
+            Recipe.tags.through(recipe_id=recipe.id, tag_id=tag.id)
+            for recipe, chosen_tags in zip(recipes, recipe_tags)
+            for tag in chosen_tags
+        ])
+        max_ingredients = min(
+            options['ingredients_per_recipe'], len(ingredient_ids)
+        )
+        self.bulk_create(IngredientInRecipe, [
+            IngredientInRecipe(
+                recipe_id=recipe.id,
+                ingredient_id=ingredient_id,
+                amount=rng.randint(1, 500)
+            )
+            for recipe in recipes
+            for ingredient_id in rng.sample(
+                ingredient_ids, rng.randint(1, max_ingredients)
+            )
+        ])
+        return recipes
+
+    def create_relations(self, users, recipes, options):
+        rng = self.rng
+        favorites = []
+        cart = []
+        subscriptions = []
+        for user in users:
+            for recipe in rng.sample(
+                recipes, min(options['favorites'], len(recipes))
+            ):
+                favorites.append(Favorite(user=user, recipe=recipe))
+            for recipe in rng.sample(
+                recipes, min(options['cart'], len(recipes))
+            ):
+                cart.append(ShoppingList(user=user, recipe=recipe))
+            for author in rng.sample(
+                users, min(options['subscriptions'] + 1, len(users))
+            )[:options['subscriptions']]:
+                if author != user:
+                    subscriptions.append(
+                        Subscription(subscriber=user, subscription=author)
+                    )
+        self.bulk_create(Favorite, favorites, ignore_conflicts=True)
+        self.bulk_create(ShoppingList, cart, ignore_conflicts=True)
+        self.bulk_create(Subscription, subscriptions, ignore_conflicts=True)
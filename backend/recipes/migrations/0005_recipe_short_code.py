@@ -0,0 +1,45 @@
+# Generated by Django 5.1.4 on 2026-10-18 01:33
+
+from django.db import migrations, models
+
+from core.short_codes import encode_short_code
+
+BATCH_SIZE = 1000
+
+
+def backfill_short_codes(apps, schema_editor):
+    Recipe = apps.get_model('recipes', 'Recipe')
+    recipes = []
+    for recipe in Recipe.objects.only('id', 'short_hash').iterator():
+        recipe.legacy_short_hash = recipe.short_hash
+        recipe.short_hash = encode_short_code(recipe.id)
+        recipes.append(recipe)
+        if len(recipes) == BATCH_SIZE:
+            Recipe.objects.bulk_update(
+                recipes, ('short_hash', 'legacy_short_hash')
+            )
+            recipes = []
+    Recipe.objects.bulk_update(recipes, ('short_hash', 'legacy_short_hash'))
+
+
+def restore_legacy_hashes(apps, schema_editor):
+    Recipe = apps.get_model('recipes', 'Recipe')
+    Recipe.objects.filter(legacy_short_hash__isnull=False).update(
+        short_hash=models.F('legacy_short_hash')
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0004_ingredient_name_pattern_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='legacy_short_hash',
+            field=models.CharField(blank=True, editable=False, max_length=8, null=True, unique=True, verbose_name='Уникальная строка старого формата'),
+        ),
+        migrations.RunPython(backfill_short_codes, restore_legacy_hashes),
+    ]
@@ -0,0 +1,22 @@
+from django.db import migrations
+
+from recipes import fulltext
+
+
+def create_search_index(apps, schema_editor):
+    fulltext.install(schema_editor)
+
+
+def drop_search_index(apps, schema_editor):
+    fulltext.uninstall(schema_editor)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0008_tags_mask'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
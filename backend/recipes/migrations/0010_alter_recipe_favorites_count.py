@@ -0,0 +1,32 @@
+# Generated by Django 5.1.4 on 2026-10-18 02:21
+
+import core.models
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    """
+    CounterField отличается от PositiveIntegerField только в Python,
+    поэтому меняется лишь состояние миграций: в SQLite AlterField
+    пересоздал бы таблицу рецептов вместе с триггерами поиска.
+    """
+
+    dependencies = [
+        ('recipes', '0009_recipe_search'),
+    ]
+
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.AlterField(
+                    model_name='recipe',
+                    name='favorites_count',
+                    field=core.models.CounterField(
+                        default=0,
+                        editable=False,
+                        verbose_name='Добавлений в избранное'
+                    ),
+                ),
+            ]
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.1.4 on 2026-10-18 02:28
+
+from django.db import migrations, models
+
+from recipes import fulltext
+
+
+def restore_search_index(apps, schema_editor):
+    # SQLite пересоздаёт таблицу рецептов при добавлении столбца,
+    # и триггеры полнотекстового индекса удаляются вместе с ней.
+    fulltext.install(schema_editor)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0010_alter_recipe_favorites_count'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='image_variants_ready',
+            field=models.BooleanField(default=False, editable=False, verbose_name='Уменьшенные копии изображения созданы'),
+        ),
+        migrations.RunPython(
+            restore_search_index, migrations.RunPython.noop
+        ),
+    ]
@@ -1,8 +1,10 @@
-import hashlib
+from collections import defaultdict
 
 from django.contrib.auth import get_user_model
+from django.core.exceptions import ValidationError
 from django.core.validators import MaxValueValidator, MinValueValidator
-from django.db import models
+from django.db import IntegrityError, models, transaction
+from django.db.models.functions import Greatest
 
 from core.constants import (
     MAX_COOCKING_TIME,
@@ -12,9 +14,12 @@ from core.constants import (
     MAX_LENGTH_INGREDIENT_UNIT,
     MAX_LENGTH_RECIPE_NAME,
     MAX_LENGTH_SHORT_HASH,
+    MAX_TAGS_COUNT,
     MIN_COOCKING_TIME,
     MIN_INGREDIENT_AMOUNT,
 )
+from core.models import CounterField, LoadedImagesMixin
+from core.short_codes import encode_short_code
 
 User = get_user_model()
 
@@ -99,6 +104,11 @@ class Tag(models.Model):
         unique=True,
         verbose_name='Уникальный слаг'
     )
+    bit = models.PositiveSmallIntegerField(
+        unique=True,
+        editable=False,
+        verbose_name='Номер бита в маске тегов'
+    )
 
     class Meta:
         verbose_name = 'Тег'
@@ -108,8 +118,56 @@ class Tag(models.Model):
     def __str__(self):
         return self.name
 
+    def clean(self):
+        if self.bit is None and self.get_free_bit() is None:
+            raise ValidationError(
+                f'Нельзя создать больше {MAX_TAGS_COUNT} тегов.'
+            )
+
+    @staticmethod
+    def get_free_bit():
+        used_bits = set(Tag.objects.values_list('bit', flat=True))
+        free_bits = set(range(MAX_TAGS_COUNT)) - used_bits
+        return min(free_bits, default=None)
+
+    def save(self, *args, **kwargs):
+        """
+        Назначает новому тегу свободный бит маски.
+
+        Параллельное создание тегов может выбрать один и тот же бит,
+        тогда уникальный индекс отклоняет вставку, и сохранение
+        повторяется со следующим свободным битом.
+        """
+        if self.bit is not None:
+            return super().save(*args, **kwargs)
+        while True:
+            self.bit = self.get_free_bit()
+            if self.bit is None:
+                raise ValidationError(
+                    f'Нельзя создать больше {MAX_TAGS_COUNT} тегов.'
+                )
+            try:
+                with transaction.atomic():
+                    return super().save(*args, **kwargs)
+            except IntegrityError:
+                bit_taken = Tag.objects.filter(bit=self.bit).exists()
+                self.bit = None
+                if not bit_taken:
+                    raise
 
-class Recipe(models.Model):
+    @property
+    def mask(self):
+        return 1 << self.bit
+
+    @staticmethod
+    def get_mask(bits):
+        mask = 0
+        for bit in bits:
+            mask |= 1 << bit
+        return mask
+
+
+class Recipe(LoadedImagesMixin, models.Model):
     author = models.ForeignKey(
         User,
         on_delete=models.CASCADE,
@@ -124,6 +182,11 @@ class Recipe(models.Model):
         upload_to='recipes/images/',
         verbose_name='Изображение готового блюда',
     )
+    image_variants_ready = models.BooleanField(
+        verbose_name='Уменьшенные копии изображения созданы',
+        default=False,
+        editable=False
+    )
     text = models.TextField(
         verbose_name='Описание рецепта'
     )
@@ -161,18 +224,59 @@ class Recipe(models.Model):
         null=True,
         unique=True
     )
+    legacy_short_hash = models.CharField(
+        verbose_name='Уникальная строка старого формата',
+        max_length=MAX_LENGTH_SHORT_HASH,
+        blank=True,
+        null=True,
+        unique=True,
+        editable=False
+    )
+    favorites_count = CounterField(
+        verbose_name='Добавлений в избранное'
+    )
+    tags_mask = models.BigIntegerField(
+        verbose_name='Битовая маска тегов',
+        default=0,
+        editable=False
+    )
+
+    variant_image_fields = ('image',)
 
     class Meta:
         verbose_name = 'Рецепт'
         verbose_name_plural = 'Рецепты'
-        ordering = ('-pub_date',)
+        ordering = ('-pub_date', '-id')
+        indexes = [
+            models.Index(
+                fields=['-pub_date', '-id'],
+                name='recipe_pub_date_id_idx'
+            )
+        ]
 
     def save(self, *args, **kwargs):
-        if not self.short_hash:
-            unique_string = f'{self.id}-{self.name}-{self.text}'
-            hash_object = hashlib.sha256(unique_string.encode())
-            self.short_hash = hash_object.hexdigest()[:MAX_LENGTH_SHORT_HASH]
         super().save(*args, **kwargs)
+        if not self.short_hash:
+            self.short_hash = encode_short_code(self.id)
+            super().save(update_fields=['short_hash'])
+
+    @classmethod
+    def update_tags_masks(cls, recipe_ids):
+        """Пересчитывает битовые маски тегов рецептов."""
+        recipe_ids = set(recipe_ids)
+        bits = defaultdict(list)
+        for recipe_id, bit in cls.tags.through.objects.filter(
+            recipe__in=recipe_ids
+        ).values_list('recipe', 'tag__bit'):
+            bits[recipe_id].append(bit)
+        cls.objects.bulk_update(
+            [
+                cls(id=recipe_id, tags_mask=Tag.get_mask(bits[recipe_id]))
+                for recipe_id in recipe_ids
+            ],
+            ('tags_mask',),
+            batch_size=1000
+        )
 
     def __str__(self):
         return self.name
@@ -238,3 +342,105 @@ class ShoppingList(models.Model):
 
     def __str__(self):
         return self.recipe.name
+
+
+class ShoppingCartIngredientManager(models.Manager):
+    """Менеджер для поддержки сумм ингредиентов в списках покупок."""
+
+    def get_totals(self, user_ids=None, ingredient_ids=None):
+        """Суммы ингредиентов, посчитанные по рецептам списков покупок."""
+        filters = {'recipe__shopping_listed__isnull': False}
+        if user_ids is not None:
+            filters['recipe__shopping_listed__user__in'] = user_ids
+        if ingredient_ids is not None:
+            filters['ingredient__in'] = ingredient_ids
+        items = IngredientInRecipe.objects.filter(**filters)
+        return {
+            (item['recipe__shopping_listed__user'], item['ingredient']):
+                item['total']
+            for item in items.values(
+                'recipe__shopping_listed__user', 'ingredient'
+            ).annotate(total=models.Sum('amount')).order_by()
+        }
+
+    def add_amounts(self, user_ids, amounts):
+        """
+        Прибавляет количества ингредиентов к суммам пользователей.
+
+        amounts - словарь id ингредиента и изменения количества,
+        отрицательные значения вычитаются. Суммы меняются атомарно
+        через F(), недостающие строки создаются, обнулившиеся удаляются.
+        """
+        amounts = {
+            ingredient_id: amount
+            for ingredient_id, amount in amounts.items() if amount
+        }
+        if not amounts:
+            return
+        user_ids = list(user_ids)
+        if not user_ids:
+            return
+        added_ids = [
+            ingredient_id for ingredient_id, amount in amounts.items()
+            if amount > 0
+        ]
+        self.bulk_create(
+            [
+                self.model(
+                    user_id=user_id, ingredient_id=ingredient_id, amount=0
+                )
+                for user_id in user_ids
+                for ingredient_id in added_ids
+            ],
+            ignore_conflicts=True,
+            batch_size=1000
+        )
+        rows = self.filter(user__in=user_ids, ingredient__in=amounts)
+        rows.update(amount=Greatest(
+            models.F('amount') + models.Case(
+                *(
+                    models.When(ingredient=ingredient_id, then=amount)
+                    for ingredient_id, amount in amounts.items()
+                ),
+                default=0,
+                output_field=models.IntegerField()
+            ),
+            0
+        ))
+        if len(added_ids) < len(amounts):
+            rows.filter(amount=0).delete()
+
+
+class ShoppingCartIngredient(models.Model):
+    """Класс модели для суммарного количества ингредиента в списке покупок."""
+
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        verbose_name='Пользователь списка покупок',
+        related_name='shopping_cart_ingredients'
+    )
+    ingredient = models.ForeignKey(
+        Ingredient,
+        on_delete=models.CASCADE,
+        verbose_name='Ингредиент'
+    )
+    amount = models.PositiveIntegerField(
+        verbose_name='Суммарное количество ингредиента'
+    )
+
+    objects = ShoppingCartIngredientManager()
+
+    class Meta:
+        verbose_name = 'Ингредиент в списке покупок'
+        verbose_name_plural = 'Ингредиенты в списках покупок'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'ingredient'],
+                name='unique_shopping_cart_user-ingredient',
+                violation_error_message='Ингредиент уже в списке покупок.'
+            )
+        ]
+
+    def __str__(self):
+        return f'{self.ingredient.name} - {self.amount}'
@@ -0,0 +1,367 @@
+import heapq
+import random
+import threading
+import time
+import uuid
+from bisect import bisect_left
+from collections import Counter, defaultdict
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, ExpressionWrapper, F, FloatField, Q
+
+from core.caches import has_atomic_incr
+from core.constants import (
+    COOKABLE_INDEX_CHANGES_TIMEOUT,
+    COOKABLE_INDEX_MAX_CHANGES,
+    COOKABLE_INDEX_REBUILD_INTERVAL,
+)
+from recipes.models import Ingredient, IngredientInRecipe
+from recipes.versions import reference_data_version
+
+
+class IngredientSearchIndex:
+    """
+    Индекс ингредиентов в памяти процесса для поиска по началу названия.
+
+    Хранит отсортированный массив названий в нижнем регистре, поиск
+    выполняется бинарным поиском. Индекс перестраивается при следующем
+    обращении после смены версии справочных данных.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._data = (None, [], [])
+
+    def is_enabled(self):
+        return (
+            settings.INGREDIENT_SEARCH_INDEX
+            and reference_data_version.is_shared()
+        )
+
+    def build(self, version):
+        ingredients = sorted(
+            Ingredient.objects.order_by().values_list(
+                'id', 'name', 'measurement_unit'
+            ),
+            key=lambda item: (item[1].casefold(), item[0])
+        )
+        keys = [name.casefold() for _, name, _ in ingredients]
+        items = [
+            {'id': id, 'name': name, 'measurement_unit': measurement_unit}
+            for id, name, measurement_unit in ingredients
+        ]
+        return version, keys, items
+
+    def get_data(self, version=None):
+        if version is None:
+            version = reference_data_version.get_token()
+        if self._data[0] != version:
+            with self._lock:
+                if self._data[0] != version:
+                    self._data = self.build(version)
+        return self._data
+
+    async def aget_data(self):
+        version = await reference_data_version.aget_token()
+        if self._data[0] != version:
+            return await sync_to_async(self.get_data)(version)
+        return self._data
+
+    def search(self, prefix=None, limit=None):
+        """Ингредиенты, название которых начинается с prefix."""
+        return self.find(self.get_data(), prefix, limit)
+
+    async def asearch(self, prefix=None, limit=None):
+        return self.find(await self.aget_data(), prefix, limit)
+
+    def find(self, data, prefix, limit):
+        _, keys, items = data
+        if not prefix:
+            return items
+        prefix = prefix.casefold()
+        start = bisect_left(keys, prefix)
+        end = bisect_left(keys, prefix + '\U0010ffff', lo=start)
+        if limit is not None:
+            end = min(end, start + limit)
+        return items[start:end]
+
+
+ingredient_index = IngredientSearchIndex()
+
+
+class CookableRecipes:
+    """
+    Рецепты, для которых есть хотя бы один из имеющихся ингредиентов.
+
+    Упорядочены по числу недостающих ингредиентов, затем по убыванию
+    доли имеющихся и от новых рецептов к старым. Срез вычисляет
+    только нужное начало списка, поэтому страница не требует полной
+    сортировки.
+    """
+
+    def __init__(self, counts, recipe_ingredients):
+        self.counts = counts
+        self.recipe_ingredients = recipe_ingredients
+
+    def __len__(self):
+        return len(self.counts)
+
+    @staticmethod
+    def rank(item):
+        recipe_id, (owned, total) = item
+        return total - owned, -owned / total, -recipe_id
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice) or index.step is not None:
+            raise TypeError('Поддерживаются только срезы без шага.')
+        start, stop, _ = index.indices(len(self))
+        ranked = heapq.nsmallest(stop, self.counts.items(), key=self.rank)
+        return [
+            (recipe_id, owned, total)
+            for recipe_id, (owned, total) in ranked[start:stop]
+        ]
+
+    def get_recipe_ingredients(self, recipe_ids):
+        return {
+            recipe_id: self.recipe_ingredients[recipe_id]
+            for recipe_id in recipe_ids
+        }
+
+
+class CookableRecipesQuery:
+    """
+    Та же выборка, что и в CookableRecipes, группировкой
+    IngredientInRecipe в БД.
+
+    Используется, когда обратный индекс в памяти отключён.
+    """
+
+    def __init__(self, ingredient_ids, max_missing=None):
+        queryset = IngredientInRecipe.objects.values('recipe').annotate(
+            total=Count('id'),
+            owned=Count('id', filter=Q(ingredient__in=ingredient_ids))
+        ).filter(owned__gt=0).annotate(
+            missing=F('total') - F('owned'),
+            coverage=ExpressionWrapper(
+                F('owned') * 1.0 / F('total'), output_field=FloatField()
+            )
+        )
+        if max_missing is not None:
+            queryset = queryset.filter(missing__lte=max_missing)
+        self.queryset = queryset.order_by(
+            'missing', '-coverage', '-recipe_id'
+        )
+
+    def count(self):
+        return self.queryset.count()
+
+    def __getitem__(self, index):
+        return list(
+            self.queryset.values_list('recipe', 'owned', 'total')[index]
+        )
+
+    def get_recipe_ingredients(self, recipe_ids):
+        recipe_ingredients = defaultdict(set)
+        for recipe_id, ingredient_id in IngredientInRecipe.objects.filter(
+            recipe__in=recipe_ids
+        ).values_list('recipe_id', 'ingredient_id'):
+            recipe_ingredients[recipe_id].add(ingredient_id)
+        return recipe_ingredients
+
+
+class CookableRecipeIndex:
+    """
+    Обратный индекс ингредиент -> рецепты в памяти процесса.
+
+    Изменённые рецепты записываются в журнал в общем кэше, и каждый
+    процесс при следующем обращении перечитывает из БД только их.
+    Полностью индекс перестраивается при первом обращении, при смене
+    эпохи после массовой загрузки данных, если журнал неполон и раз
+    в COOKABLE_INDEX_REBUILD_INTERVAL секунд на случай пропущенных
+    изменений. Снимок индекса заменяется целиком, поэтому чтение
+    не блокируется.
+
+    Записи журнала помечены эпохой, а номер в журнале после потери
+    счётчика продолжается со случайного значения, поэтому чужие или
+    старые записи не принимаются за продолжение журнала: номер
+    меньше уже прочитанного, разрыв в журнале или запись другой
+    эпохи приводят к перестроению. Журнал нумеруется через incr,
+    поэтому индекс включается только с общим кэшем, где incr
+    атомарен между процессами.
+    """
+
+    def __init__(self, prefix='cookable_index'):
+        self.epoch_key = f'{prefix}:epoch'
+        self.sequence_key = f'{prefix}:sequence'
+        self.change_key = f'{prefix}:change:{{}}'
+        self._lock = threading.Lock()
+        self._data = (None, 0, {}, {})
+        self._built_at = 0
+
+    def is_enabled(self):
+        return has_atomic_incr()
+
+    def get_epoch(self):
+        return cache.get_or_set(
+            self.epoch_key, lambda: uuid.uuid4().hex, None
+        )
+
+    def start_sequence(self):
+        cache.add(self.sequence_key, random.getrandbits(48), None)
+
+    def record_changes(self, recipe_ids):
+        """Заносит рецепты в журнал изменений после фиксации транзакции."""
+        if not self.is_enabled():
+            return
+        recipe_ids = list(recipe_ids)
+
+        def record():
+            epoch = self.get_epoch()
+            self.start_sequence()
+            sequence = cache.incr(self.sequence_key)
+            cache.set(
+                self.change_key.format(sequence),
+                (epoch, recipe_ids),
+                COOKABLE_INDEX_CHANGES_TIMEOUT
+            )
+
+        transaction.on_commit(record)
+
+    def invalidate(self):
+        """Требует полного перестроения индекса во всех процессах."""
+        transaction.on_commit(
+            lambda: cache.set(self.epoch_key, uuid.uuid4().hex, None)
+        )
+
+    def get_state(self):
+        values = cache.get_many((self.epoch_key, self.sequence_key))
+        epoch = values.get(self.epoch_key)
+        if epoch is None:
+            epoch = self.get_epoch()
+        sequence = values.get(self.sequence_key)
+        if sequence is None:
+            self.start_sequence()
+            sequence = cache.get(self.sequence_key, 0)
+        return epoch, sequence
+
+    def build(self, epoch, sequence):
+        self._built_at = time.monotonic()
+        recipe_ingredients = defaultdict(set)
+        for recipe_id, ingredient_id in IngredientInRecipe.objects.order_by(
+        ).values_list('recipe_id', 'ingredient_id').iterator(
+            chunk_size=10000
+        ):
+            recipe_ingredients[recipe_id].add(ingredient_id)
+        postings = defaultdict(set)
+        for recipe_id, ingredient_ids in recipe_ingredients.items():
+            for ingredient_id in ingredient_ids:
+                postings[ingredient_id].add(recipe_id)
+        return (
+            epoch,
+            sequence,
+            {
+                ingredient_id: frozenset(recipe_ids)
+                for ingredient_id, recipe_ids in postings.items()
+            },
+            {
+                recipe_id: frozenset(ingredient_ids)
+                for recipe_id, ingredient_ids in recipe_ingredients.items()
+            }
+        )
+
+    def get_changed_recipe_ids(self, epoch, start, end):
+        """
+        Рецепты из журнала или None, если часть записей потеряна
+        или записана в другой эпохе.
+        """
+        if end - start > COOKABLE_INDEX_MAX_CHANGES:
+            return None
+        keys = [
+            self.change_key.format(sequence)
+            for sequence in range(start + 1, end + 1)
+        ]
+        changes = cache.get_many(keys)
+        if len(changes) < len(keys) or any(
+            change_epoch != epoch for change_epoch, _ in changes.values()
+        ):
+            return None
+        return {
+            recipe_id
+            for _, recipe_ids in changes.values()
+            for recipe_id in recipe_ids
+        }
+
+    def update(self, data, sequence, recipe_ids):
+        epoch, _, postings, recipe_ingredients = data
+        postings = dict(postings)
+        recipe_ingredients = dict(recipe_ingredients)
+        current = defaultdict(set)
+        for recipe_id, ingredient_id in IngredientInRecipe.objects.filter(
+            recipe__in=recipe_ids
+        ).order_by().values_list('recipe_id', 'ingredient_id'):
+            current[recipe_id].add(ingredient_id)
+        for recipe_id in recipe_ids:
+            old = recipe_ingredients.pop(recipe_id, frozenset())
+            new = frozenset(current.get(recipe_id, ()))
+            if new:
+                recipe_ingredients[recipe_id] = new
+            for ingredient_id in old - new:
+                postings[ingredient_id] = postings[ingredient_id] - {
+                    recipe_id
+                }
+            for ingredient_id in new - old:
+                postings[ingredient_id] = postings.get(
+                    ingredient_id, frozenset()
+                ) | {recipe_id}
+        return epoch, sequence, postings, recipe_ingredients
+
+    def is_expired(self):
+        return (
+            time.monotonic() - self._built_at
+            >= COOKABLE_INDEX_REBUILD_INTERVAL
+        )
+
+    def get_data(self):
+        epoch, sequence = self.get_state()
+        data = self._data
+        if data[0] == epoch and data[1] == sequence and not self.is_expired():
+            return data
+        with self._lock:
+            data = self._data
+            if data[0] != epoch or data[1] > sequence or self.is_expired():
+                data = self.build(epoch, sequence)
+            elif data[1] < sequence:
+                recipe_ids = self.get_changed_recipe_ids(
+                    epoch, data[1], sequence
+                )
+                if recipe_ids is None:
+                    data = self.build(epoch, sequence)
+                else:
+                    data = self.update(data, sequence, recipe_ids)
+            self._data = data
+        return data
+
+    def find(self, ingredient_ids, max_missing=None):
+        """
+        Рецепты, которые можно приготовить из данных ингредиентов.
+
+        Для каждого рецепта считается, сколько его ингредиентов есть;
+        с max_missing остаются рецепты, где недостаёт не больше
+        указанного числа ингредиентов.
+        """
+        _, _, postings, recipe_ingredients = self.get_data()
+        owned = Counter()
+        for ingredient_id in set(ingredient_ids):
+            owned.update(postings.get(ingredient_id, ()))
+        counts = {}
+        for recipe_id, count in owned.items():
+            total = len(recipe_ingredients[recipe_id])
+            if max_missing is None or total - count <= max_missing:
+                counts[recipe_id] = (count, total)
+        return CookableRecipes(counts, recipe_ingredients)
+
+
+cookable_index = CookableRecipeIndex()
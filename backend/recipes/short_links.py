@@ -0,0 +1,55 @@
+from django.core.cache import cache
+
+from core.constants import SHORT_LINK_CACHE_TIMEOUT
+from core.short_codes import decode_short_code
+from recipes.models import Recipe
+
+
+def get_cache_key(code):
+    return f'short_link:{code}'
+
+
+def get_recipes(code):
+    decoded_id = decode_short_code(code)
+    if decoded_id is not None:
+        return Recipe.objects.filter(id=decoded_id)
+    return Recipe.objects.filter(legacy_short_hash=code)
+
+
+def resolve_short_link(code):
+    """
+    Id рецепта по короткой ссылке или None, если рецепта нет.
+
+    Код нового формата обратим и сразу даёт id рецепта, коды старого
+    формата ищутся по legacy_short_hash. Найденные соответствия
+    сохраняются в общем кэше, поэтому популярные ссылки не обращаются
+    к БД.
+    """
+    cache_key = get_cache_key(code)
+    recipe_id = cache.get(cache_key)
+    if recipe_id is not None:
+        return recipe_id
+    recipe_id = get_recipes(code).values_list('id', flat=True).first()
+    if recipe_id is not None:
+        cache.set(cache_key, recipe_id, SHORT_LINK_CACHE_TIMEOUT)
+    return recipe_id
+
+
+async def aresolve_short_link(code):
+    """Асинхронный вариант resolve_short_link."""
+    cache_key = get_cache_key(code)
+    recipe_id = await cache.aget(cache_key)
+    if recipe_id is not None:
+        return recipe_id
+    recipe_id = await get_recipes(code).values_list('id', flat=True).afirst()
+    if recipe_id is not None:
+        await cache.aset(cache_key, recipe_id, SHORT_LINK_CACHE_TIMEOUT)
+    return recipe_id
+
+
+def forget_short_links(recipe):
+    cache.delete_many([
+        get_cache_key(code)
+        for code in (recipe.short_hash, recipe.legacy_short_hash)
+        if code
+    ])
@@ -0,0 +1,213 @@
+from django.contrib.auth import get_user_model
+from django.db.models import F
+from django.db.models.signals import (
+    m2m_changed,
+    post_delete,
+    post_save,
+    pre_save,
+)
+from django.dispatch import receiver
+
+from core.images import delete_variants_on_commit, update_variants
+from recipes.models import (
+    Favorite,
+    Ingredient,
+    IngredientInRecipe,
+    Recipe,
+    ShoppingCartIngredient,
+    ShoppingList,
+    Tag,
+)
+from recipes.search import cookable_index
+from recipes.short_links import forget_short_links
+from recipes.versions import recipe_data_version, reference_data_version
+
+User = get_user_model()
+
+USER_SERVICE_FIELDS = {'last_login', 'password'}
+
+
+@receiver((post_save, post_delete), sender=Ingredient)
+@receiver((post_save, post_delete), sender=Tag)
+def bump_reference_data_version(**kwargs):
+    reference_data_version.bump()
+
+
+@receiver(post_delete, sender=Recipe)
+def forget_recipe_short_links(instance, **kwargs):
+    forget_short_links(instance)
+
+
+@receiver((post_save, post_delete), sender=Recipe)
+@receiver((post_save, post_delete), sender=IngredientInRecipe)
+@receiver(m2m_changed, sender=Recipe.tags.through)
+def bump_recipe_data_version(**kwargs):
+    recipe_data_version.bump()
+
+
+@receiver((post_save, post_delete), sender=Recipe)
+def record_cookable_recipe_change(instance, **kwargs):
+    cookable_index.record_changes([instance.id])
+
+
+@receiver((post_save, post_delete), sender=IngredientInRecipe)
+def record_cookable_ingredient_change(instance, **kwargs):
+    cookable_index.record_changes([instance.recipe_id])
+
+
+@receiver(pre_save, sender=ShoppingList)
+@receiver(pre_save, sender=IngredientInRecipe)
+def remember_saved_row(sender, instance, **kwargs):
+    instance.saved_row = None
+    if not instance._state.adding:
+        instance.saved_row = sender.objects.filter(pk=instance.pk).first()
+
+
+def get_cart_user_ids(recipe_id):
+    return ShoppingList.objects.filter(recipe_id=recipe_id).values_list(
+        'user', flat=True
+    )
+
+
+def get_recipe_amounts(recipe_id, sign=1):
+    return {
+        ingredient_id: sign * amount
+        for ingredient_id, amount in IngredientInRecipe.objects.filter(
+            recipe_id=recipe_id
+        ).values_list('ingredient', 'amount')
+    }
+
+
+# Суммы ингредиентов в списках покупок меняются на разницу при любом
+# сохранении и удалении рецепта в списке или ингредиента в рецепте,
+# включая каскадное удаление и удаление через QuerySet. При удалении
+# рецепта первым удаляется либо список покупок, либо ингредиенты,
+# и вклад каждой пары вычитается ровно один раз: второй обработчик
+# уже не находит парных строк.
+@receiver(post_save, sender=ShoppingList)
+def add_recipe_to_cart_amounts(instance, **kwargs):
+    previous = getattr(instance, 'saved_row', None)
+    if previous:
+        if (
+            (previous.user_id, previous.recipe_id)
+            == (instance.user_id, instance.recipe_id)
+        ):
+            return
+        remove_recipe_from_cart_amounts(previous)
+    ShoppingCartIngredient.objects.add_amounts(
+        [instance.user_id], get_recipe_amounts(instance.recipe_id)
+    )
+
+
+@receiver(post_delete, sender=ShoppingList)
+def remove_recipe_from_cart_amounts(instance, **kwargs):
+    ShoppingCartIngredient.objects.add_amounts(
+        [instance.user_id], get_recipe_amounts(instance.recipe_id, -1)
+    )
+
+
+@receiver(post_save, sender=IngredientInRecipe)
+def add_ingredient_to_cart_amounts(instance, **kwargs):
+    previous = getattr(instance, 'saved_row', None)
+    if previous:
+        if (
+            (previous.recipe_id, previous.ingredient_id, previous.amount)
+            == (instance.recipe_id, instance.ingredient_id, instance.amount)
+        ):
+            return
+        remove_ingredient_from_cart_amounts(previous)
+    ShoppingCartIngredient.objects.add_amounts(
+        get_cart_user_ids(instance.recipe_id),
+        {instance.ingredient_id: instance.amount}
+    )
+
+
+@receiver(post_delete, sender=IngredientInRecipe)
+def remove_ingredient_from_cart_amounts(instance, **kwargs):
+    ShoppingCartIngredient.objects.add_amounts(
+        get_cart_user_ids(instance.recipe_id),
+        {instance.ingredient_id: -instance.amount}
+    )
+
+
+@receiver(post_save, sender=User)
+def bump_recipe_data_version_on_author_change(
+    created, update_fields, **kwargs
+):
+    if created:
+        return
+    if update_fields and set(update_fields) <= USER_SERVICE_FIELDS:
+        return
+    recipe_data_version.bump()
+
+
+@receiver(post_save, sender=Recipe)
+def generate_recipe_image_variants(instance, update_fields, **kwargs):
+    if update_fields and 'image' not in update_fields:
+        return
+    update_variants(instance, 'image')
+
+
+@receiver(post_delete, sender=Recipe)
+def delete_recipe_image_variants(instance, **kwargs):
+    delete_variants_on_commit(instance.image)
+
+
+@receiver(post_save, sender=Favorite)
+def increase_favorites_count(instance, created, **kwargs):
+    if created:
+        Recipe.objects.filter(id=instance.recipe_id).update(
+            favorites_count=F('favorites_count') + 1
+        )
+        recipe_data_version.bump()
+
+
+@receiver(post_delete, sender=Favorite)
+def decrease_favorites_count(instance, **kwargs):
+    Recipe.objects.filter(
+        id=instance.recipe_id, favorites_count__gt=0
+    ).update(
+        favorites_count=F('favorites_count') - 1
+    )
+    recipe_data_version.bump()
+
+
+@receiver(post_save, sender=Recipe)
+def increase_recipes_count(instance, created, **kwargs):
+    if created:
+        User.objects.filter(id=instance.author_id).update(
+            recipes_count=F('recipes_count') + 1
+        )
+
+
+@receiver(post_delete, sender=Recipe)
+def decrease_recipes_count(instance, **kwargs):
+    User.objects.filter(
+        id=instance.author_id, recipes_count__gt=0
+    ).update(
+        recipes_count=F('recipes_count') - 1
+    )
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+def update_tags_mask(instance, action, reverse, pk_set, **kwargs):
+    if not reverse:
+        if action in ('post_add', 'post_remove', 'post_clear'):
+            Recipe.update_tags_masks([instance.pk])
+    elif action == 'pre_clear':
+        instance.cleared_recipe_ids = list(
+            instance.tag_recipes.values_list('id', flat=True)
+        )
+    elif action == 'post_clear':
+        Recipe.update_tags_masks(instance.cleared_recipe_ids)
+    elif action in ('post_add', 'post_remove'):
+        Recipe.update_tags_masks(pk_set)
+
+
+@receiver(post_delete, sender=Tag)
+def remove_tag_from_masks(instance, **kwargs):
+    Recipe.objects.alias(
+        tag_bit=F('tags_mask').bitand(instance.mask)
+    ).filter(tag_bit=instance.mask).update(
+        tags_mask=F('tags_mask') - instance.mask
+    )
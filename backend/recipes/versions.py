@@ -0,0 +1,64 @@
+import uuid
+
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+
+from core.caches import is_shared_cache
+
+
+class DataVersion:
+    """
+    Версия набора данных в общем кэше.
+
+    Меняется при любом изменении данных, поэтому по ней все процессы
+    сверяют свои локальные копии и ключи кэша. Если значение вытеснено
+    из кэша, создаётся новая версия, что лишь приводит к перестроению
+    копий.
+
+    Сверка работает только через общий кэш: с кэшем в памяти процесса
+    версия, изменённая в одном воркере, в других не меняется, и
+    локальные копии данных в них отключаются (см. is_shared).
+    """
+
+    def __init__(self, key):
+        self.key = key
+
+    @staticmethod
+    def is_shared():
+        return is_shared_cache()
+
+    def get(self):
+        """Пара из токена версии и времени последнего изменения."""
+        return cache.get_or_set(
+            self.key,
+            lambda: (uuid.uuid4().hex, timezone.now()),
+            None
+        )
+
+    async def aget(self):
+        return await cache.aget_or_set(
+            self.key,
+            lambda: (uuid.uuid4().hex, timezone.now()),
+            None
+        )
+
+    def get_token(self):
+        return self.get()[0]
+
+    async def aget_token(self):
+        return (await self.aget())[0]
+
+    def get_modified(self):
+        return self.get()[1]
+
+    def bump(self):
+        transaction.on_commit(
+            lambda: cache.set(
+                self.key, (uuid.uuid4().hex, timezone.now()), None
+            )
+        )
+
+
+reference_data_version = DataVersion('reference_data_version')
+recipe_data_version = DataVersion('recipe_data_version')
@@ -16,14 +16,6 @@ class UserAdmin(admin.ModelAdmin):
     )
     search_fields = ('email', 'username')
 
-    @admin.display(description='Количество подписчиков')
-    def subscribers_count(self, obj):
-        return obj.subscribers.count()
-
-    @admin.display(description='Количество рецептов')
-    def recipes_count(self, obj):
-        return obj.author_recipes.count()
-
 
 @admin.register(Subscription)
 class SubscriptionAdmin(admin.ModelAdmin):
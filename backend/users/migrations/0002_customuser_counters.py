@@ -0,0 +1,48 @@
+# Generated by Django 5.1.4 on 2026-10-18 01:35
+
+from django.db import migrations, models
+from django.db.models.functions import Coalesce
+
+
+def fill_subscribers_count(apps, schema_editor):
+    CustomUser = apps.get_model('users', 'CustomUser')
+    Subscription = apps.get_model('users', 'Subscription')
+    CustomUser.objects.update(
+        subscribers_count=Coalesce(
+            models.Subquery(
+                Subscription.objects.filter(
+                    subscription=models.OuterRef('pk')
+                ).values('subscription').annotate(
+                    count=models.Count('pk')
+                ).values('count')
+            ),
+            0
+        )
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='subscription',
+            options={'verbose_name': 'подписка', 'verbose_name_plural': 'Подписки'},
+        ),
+        migrations.AddField(
+            model_name='customuser',
+            name='recipes_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Количество рецептов'),
+        ),
+        migrations.AddField(
+            model_name='customuser',
+            name='subscribers_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Количество подписчиков'),
+        ),
+        migrations.RunPython(
+            fill_subscribers_count, migrations.RunPython.noop
+        ),
+    ]
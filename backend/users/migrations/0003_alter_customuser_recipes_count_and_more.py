@@ -0,0 +1,40 @@
+# Generated by Django 5.1.4 on 2026-10-18 02:21
+
+import core.models
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    """
+    CounterField отличается от PositiveIntegerField только в Python,
+    поэтому меняется лишь состояние миграций без пересоздания таблицы.
+    """
+
+    dependencies = [
+        ('users', '0002_customuser_counters'),
+    ]
+
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.AlterField(
+                    model_name='customuser',
+                    name='recipes_count',
+                    field=core.models.CounterField(
+                        default=0,
+                        editable=False,
+                        verbose_name='Количество рецептов'
+                    ),
+                ),
+                migrations.AlterField(
+                    model_name='customuser',
+                    name='subscribers_count',
+                    field=core.models.CounterField(
+                        default=0,
+                        editable=False,
+                        verbose_name='Количество подписчиков'
+                    ),
+                ),
+            ]
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.4 on 2026-10-18 02:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0003_alter_customuser_recipes_count_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='customuser',
+            name='avatar_variants_ready',
+            field=models.BooleanField(default=False, editable=False, verbose_name='Уменьшенные копии аватара созданы'),
+        ),
+    ]
@@ -2,10 +2,11 @@ from django.contrib.auth.models import AbstractUser
 from django.db import models
 
 from core.constants import MAX_LENGTH_EMAIL, MAX_LENGTH_USER_NAME
+from core.models import CounterField, LoadedImagesMixin
 from core.validators import validate_format
 
 
-class CustomUser(AbstractUser):
+class CustomUser(LoadedImagesMixin, AbstractUser):
     email = models.EmailField(
         max_length=MAX_LENGTH_EMAIL,
         unique=True,
@@ -37,9 +38,21 @@ class CustomUser(AbstractUser):
         null=True,
         blank=True,
     )
+    avatar_variants_ready = models.BooleanField(
+        verbose_name='Уменьшенные копии аватара созданы',
+        default=False,
+        editable=False
+    )
+    recipes_count = CounterField(
+        verbose_name='Количество рецептов'
+    )
+    subscribers_count = CounterField(
+        verbose_name='Количество подписчиков'
+    )
 
     USERNAME_FIELD = 'email'
     REQUIRED_FIELDS = ('username', 'first_name', 'last_name')
+    variant_image_fields = ('avatar',)
 
     class Meta:
         verbose_name = 'Пользователь'
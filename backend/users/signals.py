@@ -0,0 +1,51 @@
+from django.db.models import F
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from core.images import delete_variants_on_commit, update_variants
+from recipes.versions import recipe_data_version
+from users.models import CustomUser, Subscription
+from users.token_cache import forget_token, forget_user_tokens
+
+
+@receiver(post_save, sender=Subscription)
+def increase_subscribers_count(instance, created, **kwargs):
+    if created:
+        CustomUser.objects.filter(id=instance.subscription_id).update(
+            subscribers_count=F('subscribers_count') + 1
+        )
+        recipe_data_version.bump()
+
+
+@receiver(post_delete, sender=Subscription)
+def decrease_subscribers_count(instance, **kwargs):
+    CustomUser.objects.filter(
+        id=instance.subscription_id, subscribers_count__gt=0
+    ).update(
+        subscribers_count=F('subscribers_count') - 1
+    )
+    recipe_data_version.bump()
+
+
+@receiver(post_save, sender=CustomUser)
+def generate_avatar_variants(instance, update_fields, **kwargs):
+    if update_fields and 'avatar' not in update_fields:
+        return
+    update_variants(instance, 'avatar')
+
+
+@receiver(post_delete, sender=CustomUser)
+def delete_avatar_variants(instance, **kwargs):
+    delete_variants_on_commit(instance.avatar)
+
+
+@receiver(post_delete, sender=Token)
+def forget_deleted_token(instance, **kwargs):
+    forget_token(instance.key, instance.user_id)
+
+
+@receiver(post_save, sender=CustomUser)
+def forget_changed_user_tokens(instance, created, **kwargs):
+    if not created:
+        forget_user_tokens(instance.id)
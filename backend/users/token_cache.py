@@ -0,0 +1,85 @@
+import hashlib
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from rest_framework.authtoken.models import Token
+
+from core.caches import is_shared_cache
+
+
+def is_enabled():
+    """
+    Кэшировать ли пользователей по токенам.
+
+    С кэшем в памяти процесса выход из системы в одном воркере
+    не удалил бы записи в других, и токен продолжал бы действовать.
+    """
+    return settings.TOKEN_CACHE_TIMEOUT > 0 and is_shared_cache()
+
+
+def get_cache_key(key):
+    return 'auth_token:' + hashlib.sha256(key.encode()).hexdigest()
+
+
+def get_version_key(user_id):
+    return f'auth_token_version:{user_id}'
+
+
+def get_cached_user(key):
+    """
+    Пользователь из кэша или None.
+
+    Запись действительна, только пока версия токенов пользователя
+    совпадает с той, при которой она была сделана.
+    """
+    entry = cache.get(get_cache_key(key))
+    if entry is None:
+        return None
+    user, version = entry
+    if cache.get(get_version_key(user.pk)) != version:
+        return None
+    return user
+
+
+def cache_user(key, user):
+    """
+    Сохраняет пользователя токена с текущей версией его токенов.
+
+    Версия читается после того, как токен найден в БД, поэтому токен
+    проверяется ещё раз: если выход из системы завершился между
+    чтением токена и версии, запись не создаётся, а если после,
+    новая версия делает её недействительной.
+    """
+    version = cache.get_or_set(
+        get_version_key(user.pk),
+        lambda: uuid.uuid4().hex,
+        settings.TOKEN_CACHE_TIMEOUT
+    )
+    if not Token.objects.filter(key=key, user=user).exists():
+        return
+    cache.set(
+        get_cache_key(key), (user, version), settings.TOKEN_CACHE_TIMEOUT
+    )
+
+
+def forget_user_tokens(user_id):
+    """
+    Делает недействительными все записи токенов пользователя.
+
+    Версия меняется после фиксации транзакции, иначе запрос,
+    прочитавший из БД старые данные до фиксации, снова сохранил бы их.
+    """
+    transaction.on_commit(
+        lambda: cache.set(
+            get_version_key(user_id),
+            uuid.uuid4().hex,
+            settings.TOKEN_CACHE_TIMEOUT
+        )
+    )
+
+
+def forget_token(key, user_id):
+    forget_user_tokens(user_id)
+    transaction.on_commit(lambda: cache.delete(get_cache_key(key)))